@@ -0,0 +1,16 @@
+/*
+  # Index pour la pagination par curseur (keyset)
+
+  1. Indexes
+    - `candidatures` : (date_candidature DESC, id DESC)
+    - `jobs` : (statut, date_publication DESC, id DESC) pour la liste publique des offres actives
+    - `contacts` : (date_contact DESC, id DESC)
+
+  Les listes de l'API sont triées par (date DESC, id DESC) et paginées avec
+  un filtre `(date, id) < (curseur)` : ces index évitent un tri complet de la
+  table à chaque page.
+*/
+
+CREATE INDEX IF NOT EXISTS idx_candidatures_keyset ON candidatures(date_candidature DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_statut_keyset ON jobs(statut, date_publication DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_contacts_keyset ON contacts(date_contact DESC, id DESC);
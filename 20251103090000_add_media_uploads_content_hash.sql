@@ -0,0 +1,20 @@
+/*
+  # Déduplication des uploads par contenu
+
+  1. Colonnes
+    - `media_uploads.content_hash` (text) : SHA-256 hexadécimal du fichier,
+      calculé au fil de l'upload
+
+  2. Indexes
+    - `content_hash` pour les uploads réussis : recherche d'un fichier identique
+      déjà stocké avant l'envoi (mode UPLOAD_DEDUP)
+
+  La ligne de journal est supprimée avec l'objet (delete_storage_batch) : un
+  hash ne désigne donc jamais un objet absent du storage.
+*/
+
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE INDEX IF NOT EXISTS idx_media_uploads_content_hash
+  ON media_uploads(content_hash)
+  WHERE status = 'success' AND content_hash IS NOT NULL;
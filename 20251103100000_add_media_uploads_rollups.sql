@@ -0,0 +1,111 @@
+/*
+  # Compteurs agrégés des uploads (rollups)
+
+  1. New Tables
+    - `media_upload_rollups` : nombre d'uploads et volume cumulés par
+      (file_type, category, status)
+    - `media_upload_daily_rollups` : mêmes compteurs par jour, pour les
+      répartitions journalières/hebdomadaires de /upload-stats
+
+  2. Trigger
+    - `media_uploads_rollup` (AFTER INSERT OR DELETE sur `media_uploads`) :
+      maintient les deux tables dans la transaction de l'écriture ; /upload-stats
+      ne lit plus que ces compteurs au lieu de parcourir tout le journal
+
+  3. Backfill
+    - Les compteurs sont recalculés une fois à partir des lignes existantes
+
+  4. Security
+    - RLS activée, lecture publique (comme `media_uploads`)
+*/
+
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS category text;
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS size bigint;
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS created_at timestamptz DEFAULT now();
+
+CREATE TABLE IF NOT EXISTS media_upload_rollups (
+  file_type text NOT NULL,
+  category text NOT NULL,
+  status text NOT NULL,
+  uploads bigint NOT NULL DEFAULT 0,
+  total_size bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (file_type, category, status)
+);
+
+CREATE TABLE IF NOT EXISTS media_upload_daily_rollups (
+  day date NOT NULL,
+  file_type text NOT NULL,
+  category text NOT NULL,
+  status text NOT NULL,
+  uploads bigint NOT NULL DEFAULT 0,
+  total_size bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, file_type, category, status)
+);
+
+CREATE OR REPLACE FUNCTION media_uploads_rollup() RETURNS trigger
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+  r media_uploads%ROWTYPE;
+  sign integer;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    r := NEW;
+    sign := 1;
+  ELSE
+    r := OLD;
+    sign := -1;
+  END IF;
+
+  INSERT INTO media_upload_rollups AS t (file_type, category, status, uploads, total_size)
+  VALUES (COALESCE(r.file_type, 'unknown'), COALESCE(r.category, 'unknown'), COALESCE(r.status, 'unknown'),
+          sign, sign * COALESCE(r.size, 0))
+  ON CONFLICT (file_type, category, status) DO UPDATE
+    SET uploads = t.uploads + EXCLUDED.uploads,
+        total_size = t.total_size + EXCLUDED.total_size;
+
+  INSERT INTO media_upload_daily_rollups AS t (day, file_type, category, status, uploads, total_size)
+  VALUES ((COALESCE(r.created_at, now()) AT TIME ZONE 'UTC')::date,
+          COALESCE(r.file_type, 'unknown'), COALESCE(r.category, 'unknown'), COALESCE(r.status, 'unknown'),
+          sign, sign * COALESCE(r.size, 0))
+  ON CONFLICT (day, file_type, category, status) DO UPDATE
+    SET uploads = t.uploads + EXCLUDED.uploads,
+        total_size = t.total_size + EXCLUDED.total_size;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS media_uploads_rollup ON media_uploads;
+CREATE TRIGGER media_uploads_rollup
+  AFTER INSERT OR DELETE ON media_uploads
+  FOR EACH ROW EXECUTE FUNCTION media_uploads_rollup();
+
+TRUNCATE media_upload_rollups, media_upload_daily_rollups;
+
+INSERT INTO media_upload_rollups (file_type, category, status, uploads, total_size)
+SELECT COALESCE(file_type, 'unknown'), COALESCE(category, 'unknown'), COALESCE(status, 'unknown'),
+       count(*), COALESCE(sum(size), 0)
+FROM media_uploads
+GROUP BY 1, 2, 3;
+
+INSERT INTO media_upload_daily_rollups (day, file_type, category, status, uploads, total_size)
+SELECT (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date,
+       COALESCE(file_type, 'unknown'), COALESCE(category, 'unknown'), COALESCE(status, 'unknown'),
+       count(*), COALESCE(sum(size), 0)
+FROM media_uploads
+GROUP BY 1, 2, 3, 4;
+
+ALTER TABLE media_upload_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE media_upload_daily_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access to media upload rollups"
+  ON media_upload_rollups
+  FOR SELECT
+  TO public
+  USING (true);
+
+CREATE POLICY "Public read access to media upload daily rollups"
+  ON media_upload_daily_rollups
+  FOR SELECT
+  TO public
+  USING (true);
@@ -0,0 +1,13 @@
+/*
+  # Variantes d'images (miniatures, WebP)
+
+  1. Colonnes
+    - `media_uploads.variants` (jsonb) : variantes générées après l'upload
+      d'une image, par nom (`thumb`, `thumb_webp`, `medium_webp`, `webp`...) :
+      `{public_url, storage_path, file_type, width, height, size}`
+
+  Les variantes sont stockées à côté de l'original
+  (`images/<nom>__<variante>.<ext>`) et supprimées avec lui.
+*/
+
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS variants jsonb;
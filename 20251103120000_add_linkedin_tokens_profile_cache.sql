@@ -0,0 +1,30 @@
+/*
+  # Tokens LinkedIn et cache de profil
+
+  1. Colonnes (`linkedin_tokens`)
+    - `linkedin_sub` (text, unique) : identifiant OpenID LinkedIn, clé des
+      enregistrements de la fonction linkedin_auth
+    - `profile` (jsonb) : profil normalisé renvoyé au frontend (user_data)
+    - `profile_fetched_at` (timestamptz) : date du dernier appel /v2/userinfo,
+      le profil est resservi tant qu'il a moins de LINKEDIN_PROFILE_TTL secondes
+    - `updated_at` (timestamptz)
+    - `user_id` devient facultatif : un login LinkedIn n'a pas forcément de
+      compte `users` associé
+
+  2. Indexes
+    - `access_token` : reprise de session d'un utilisateur de retour
+
+  3. Security
+    - Pas de nouvelle policy : les policies existantes (TO authenticated,
+      auth.uid() = user_id) refusent tout à `anon`, la fonction lit et écrit
+      donc avec la clé service_role (SUPABASE_SERVICE_ROLE_KEY) ; les tokens
+      ne sont jamais lisibles par `anon`
+*/
+
+ALTER TABLE linkedin_tokens ALTER COLUMN user_id DROP NOT NULL;
+ALTER TABLE linkedin_tokens ADD COLUMN IF NOT EXISTS linkedin_sub text UNIQUE;
+ALTER TABLE linkedin_tokens ADD COLUMN IF NOT EXISTS profile jsonb;
+ALTER TABLE linkedin_tokens ADD COLUMN IF NOT EXISTS profile_fetched_at timestamptz;
+ALTER TABLE linkedin_tokens ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_linkedin_tokens_access_token ON linkedin_tokens(access_token);
@@ -0,0 +1,22 @@
+/*
+  # Index keyset : dates NULL en fin de liste
+
+  1. Indexes
+    - `candidatures`, `jobs`, `contacts` : les index keyset sont recréés en
+      `DESC NULLS LAST`, l'ordre utilisé par les listes de l'API
+
+  Les lignes sans date de tri sont servies après toutes les lignes datées
+  (le curseur d'une telle ligne ne porte que son id) ; avec le `DESC` par
+  défaut (NULLS FIRST) l'index ne correspondait plus à l'ordre demandé.
+*/
+
+DROP INDEX IF EXISTS idx_candidatures_keyset;
+DROP INDEX IF EXISTS idx_jobs_statut_keyset;
+DROP INDEX IF EXISTS idx_contacts_keyset;
+
+CREATE INDEX IF NOT EXISTS idx_candidatures_keyset
+  ON candidatures(date_candidature DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_statut_keyset
+  ON jobs(statut, date_publication DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_contacts_keyset
+  ON contacts(date_contact DESC NULLS LAST, id DESC);
@@ -0,0 +1,32 @@
+/*
+  # Date de modification des offres
+
+  1. Colonnes
+    - `jobs.updated_at` (timestamptz) : mise à jour par le trigger
+      `update_updated_at_column` à chaque modification
+
+  2. Indexes
+    - `updated_at DESC` : la sonde de fraîcheur du cache des offres
+      (plus récente modification + nombre d'offres visibles) reste une
+      lecture d'index
+
+  Chaque worker compare périodiquement cette sonde à sa dernière valeur et
+  vide son cache des offres si elle a changé : une écriture traitée par un
+  autre worker est visible en JOBS_FRESHNESS_INTERVAL secondes au plus.
+*/
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at DESC NULLS LAST);
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname = 'update_jobs_updated_at'
+  ) THEN
+    CREATE TRIGGER update_jobs_updated_at
+      BEFORE UPDATE ON jobs
+      FOR EACH ROW
+      EXECUTE FUNCTION update_updated_at_column();
+  END IF;
+END $$;
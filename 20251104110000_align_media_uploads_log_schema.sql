@@ -0,0 +1,49 @@
+/*
+  # Alignement de `media_uploads` sur le journal écrit par l'API
+
+  Le journal (upload.py, via audit_log) écrit `unique_filename`, `size`,
+  `category` et `created_at`, et les lignes d'échec n'ont ni objet stocké
+  ni URL : avec le schéma d'origine chaque insertion était refusée, les
+  rollups restaient vides et la déduplication / les variantes ne
+  trouvaient aucune ligne.
+
+  1. Colonnes
+    - `unique_filename` (text) : nom généré de l'objet dans le bucket
+      (l'API renseigne aussi `filename` avec la même valeur)
+    - `file_size` passe en bigint (même type que `size`)
+    - `filename`, `file_type`, `file_size`, `storage_path`, `public_url`
+      deviennent facultatifs : une ligne `status = 'error'` n'a pas
+      d'objet stocké (l'unicité de `storage_path` ignore les NULL)
+
+  2. Backfill
+    - `unique_filename`, `size` et `created_at` sont repris des colonnes
+      d'origine pour les lignes existantes, puis les rollups sont recalculés
+*/
+
+ALTER TABLE media_uploads ADD COLUMN IF NOT EXISTS unique_filename text;
+
+ALTER TABLE media_uploads ALTER COLUMN filename DROP NOT NULL;
+ALTER TABLE media_uploads ALTER COLUMN file_type DROP NOT NULL;
+ALTER TABLE media_uploads ALTER COLUMN file_size DROP NOT NULL;
+ALTER TABLE media_uploads ALTER COLUMN file_size TYPE bigint;
+ALTER TABLE media_uploads ALTER COLUMN storage_path DROP NOT NULL;
+ALTER TABLE media_uploads ALTER COLUMN public_url DROP NOT NULL;
+
+UPDATE media_uploads SET unique_filename = filename WHERE unique_filename IS NULL;
+UPDATE media_uploads SET size = file_size WHERE size IS NULL;
+UPDATE media_uploads SET created_at = upload_date WHERE upload_date IS NOT NULL AND created_at > upload_date;
+
+TRUNCATE media_upload_rollups, media_upload_daily_rollups;
+
+INSERT INTO media_upload_rollups (file_type, category, status, uploads, total_size)
+SELECT COALESCE(file_type, 'unknown'), COALESCE(category, 'unknown'), COALESCE(status, 'unknown'),
+       count(*), COALESCE(sum(size), 0)
+FROM media_uploads
+GROUP BY 1, 2, 3;
+
+INSERT INTO media_upload_daily_rollups (day, file_type, category, status, uploads, total_size)
+SELECT (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date,
+       COALESCE(file_type, 'unknown'), COALESCE(category, 'unknown'), COALESCE(status, 'unknown'),
+       count(*), COALESCE(sum(size), 0)
+FROM media_uploads
+GROUP BY 1, 2, 3, 4;
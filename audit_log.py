@@ -0,0 +1,231 @@
+"""
+Journal d'audit bufferisé pour AE2I
+Les enregistrements (ex. media_uploads) sont accumulés en mémoire puis
+insérés par lots par un thread de fond, au seuil de taille ou de temps,
+au lieu d'un aller-retour base de données par réponse d'upload.
+"""
+
+import os
+import time
+import logging
+import threading
+import atexit
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from metrics import LOG_ROWS_REJECTED
+
+logger = logging.getLogger(__name__)
+
+MEDIA_LOG_ASYNC = os.getenv("MEDIA_LOG_ASYNC", "1") in ("1", "true")
+MEDIA_LOG_BATCH_SIZE = int(os.getenv("MEDIA_LOG_BATCH_SIZE", "50"))
+MEDIA_LOG_FLUSH_INTERVAL = float(os.getenv("MEDIA_LOG_FLUSH_INTERVAL", "1"))
+MEDIA_LOG_MAX_BUFFER = int(os.getenv("MEDIA_LOG_MAX_BUFFER", "10000"))
+
+
+class BufferedLogWriter:
+    """
+    Buffer mémoire + flusher de fond pour les insertions de journal.
+    Les enregistrements sont best-effort : un lot refusé par la base est
+    réessayé ligne par ligne (les lignes invalides sont abandonnées, journalisées
+    en erreur et comptées dans log_rows_rejected_total) ; si la
+    base est injoignable, le lot est remis en tête du buffer, dans la limite
+    de max_buffer.
+    """
+
+    def __init__(self, client, table: str,
+                 batch_size: int = MEDIA_LOG_BATCH_SIZE,
+                 flush_interval: float = MEDIA_LOG_FLUSH_INTERVAL,
+                 max_buffer: int = MEDIA_LOG_MAX_BUFFER,
+                 enabled: bool = MEDIA_LOG_ASYNC):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.enabled = enabled
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.last_rejection: Optional[str] = None
+        self.last_flush_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        atexit.register(self.stop)
+
+    def write(self, record: dict):
+        """
+        Ajoute un enregistrement (insertion immédiate si le mode asynchrone est désactivé)
+        """
+        if not self.enabled:
+            self._insert([record])
+            return
+
+        self.ensure_started()
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self, predicate: Callable[[dict], bool]) -> Optional[dict]:
+        """
+        Premier enregistrement pas encore inséré qui satisfait predicate
+        """
+        with self._lock:
+            for record in self._buffer:
+                if predicate(record):
+                    return record
+        return None
+
+    def ensure_started(self):
+        """
+        Démarre le flusher dans le processus courant (après le fork gunicorn)
+        """
+        with self._start_lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Le buffer hérité du parent reste à la charge du parent
+                with self._lock:
+                    self._buffer.clear()
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'{self.table}-log-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Arrête le flusher après une dernière vidange
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        elif self._pid == os.getpid():
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erreur du journal {self.table}: {str(e)}")
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Erreur de vidange finale du journal {self.table}: {str(e)}")
+
+    def _take(self) -> List[dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _requeue(self, records: List[dict]):
+        with self._lock:
+            self._buffer.extendleft(reversed(records))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+
+    def flush(self) -> int:
+        """
+        Insère tout le buffer par lots
+        Returns: nombre d'enregistrements insérés
+        """
+        inserted = 0
+        with self._flush_lock:
+            while True:
+                records = self._take()
+                if not records:
+                    break
+                written, retry = self._insert(records)
+                inserted += written
+                if retry:
+                    self._requeue(retry)
+                    break
+        return inserted
+
+    def _insert(self, records: List[dict]):
+        """
+        Insertion groupée, puis ligne par ligne si la base refuse le lot
+        Returns: (nombre inséré, enregistrements à réessayer plus tard)
+        """
+        try:
+            self.client.table(self.table).insert(records).execute()
+            self._flushed(len(records))
+            return len(records), []
+        except Exception as e:
+            self.last_error = str(e)
+            if not is_rejected(e):
+                logger.warning(f"Journal {self.table} injoignable, {len(records)} ligne(s) en attente: {str(e)}")
+                return 0, records
+            if len(records) > 1:
+                logger.warning(f"Lot de journal refusé ({len(records)} lignes), insertion unitaire: {str(e)}")
+
+        if len(records) == 1:
+            self._rejected(records[0], self.last_error)
+            return 0, []
+
+        written = 0
+        for index, record in enumerate(records):
+            try:
+                self.client.table(self.table).insert(record).execute()
+                written += 1
+            except Exception as e:
+                self.last_error = str(e)
+                if not is_rejected(e):
+                    self._flushed(written)
+                    return written, records[index:]
+                self._rejected(record, str(e))
+        self._flushed(written)
+        return written, []
+
+    def _rejected(self, record: dict, error: str):
+        """
+        Ligne refusée par la base (schéma, contrainte) : abandonnée, mais
+        journalisée en erreur et comptée (/metrics et status())
+        """
+        self.rejected += 1
+        self.last_rejection = error
+        LOG_ROWS_REJECTED.labels(self.table).inc()
+        keys = {k: record.get(k) for k in ('id', 'storage_path', 'original_filename', 'status') if k in record}
+        logger.error(f"Ligne de journal {self.table} rejetée {keys}: {error}")
+
+    def _flushed(self, count: int):
+        if count:
+            self.written += count
+            self.last_flush_at = time.time()
+
+    def status(self) -> Dict:
+        with self._lock:
+            depth = len(self._buffer)
+        return {
+            'async': self.enabled,
+            'buffered': depth,
+            'written': self.written,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'last_rejection': self.last_rejection,
+            'last_flush_at': self.last_flush_at,
+            'last_error': self.last_error
+        }
+
+
+def is_rejected(error: Exception) -> bool:
+    """
+    Erreur renvoyée par la base (ligne refusée) plutôt qu'un incident réseau
+    """
+    return type(error).__name__ in ('APIError', 'LocalAPIError')
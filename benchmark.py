@@ -0,0 +1,369 @@
+"""
+Benchmark des endpoints AE2I
+Exécute chaque route de app.py et du blueprint d'upload via le client de
+test Flask, sur le backend local (DATA_BACKEND=local) peuplé d'un jeu de
+données synthétique, et rapporte débit et latences p50/p95/p99.
+
+Usage :
+    python benchmark.py --candidatures 10000 --concurrency 8 --requests 200
+    python benchmark.py --upload-mb 50 --only upload
+    python benchmark.py --save-baseline          # enregistre la référence
+    python benchmark.py --compare --tolerance 20 # échoue si régression > 20 %
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+def configure_environment(workdir: str):
+    """
+    Force le backend local avant l'import de app/upload
+    """
+    os.environ['DATA_BACKEND'] = 'local'
+    os.environ['LOCAL_DB_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['LOCAL_STORAGE_DIR'] = os.path.join(workdir, 'storage')
+    os.environ.setdefault('INGEST_ASYNC', '0')
+    # Sessions d'upload et jobs de suppression créés par les scénarios
+    os.environ['UPLOAD_SESSIONS_DIR'] = os.path.join(workdir, 'upload_sessions')
+    os.environ['DELETE_JOBS_DIR'] = os.path.join(workdir, 'delete_jobs')
+
+
+def seed(client, candidatures: int, jobs: int, contacts: int):
+    """
+    Peuple le backend local par lots
+    """
+    start = datetime.now() - timedelta(days=365)
+
+    def batches(table, total, build):
+        for offset in range(0, total, 1000):
+            rows = [build(i) for i in range(offset, min(offset + 1000, total))]
+            client.table(table).insert(rows).execute()
+
+    batches('candidatures', candidatures, lambda i: {
+        'nom': f'Nom{i}', 'prenom': f'Prenom{i}', 'email': f'candidat{i}@example.com',
+        'telephone': '+213 555 000 000', 'poste_souhaite': random.choice(['Ingénieur', 'Technicien', 'Chef de projet']),
+        'annees_experience': i % 20, 'en_poste': bool(i % 2), 'cv_url': None,
+        'lettre_motivation': 'Lorem ipsum dolor sit amet. ' * 40,
+        'date_candidature': (start + timedelta(minutes=i)).isoformat(), 'statut': 'En attente'
+    })
+    batches('jobs', jobs, lambda i: {
+        'titre_fr': f'Offre {i}', 'titre_en': f'Job {i}', 'description_fr': 'Description ' * 50,
+        'type_contrat': 'CDI', 'localisation': 'Alger', 'competences': ['Python', 'SQL'],
+        'date_publication': (start + timedelta(hours=i)).isoformat(),
+        'statut': 'active' if i % 4 else 'inactive'
+    })
+    client.table('admins').insert({'email': 'admin@example.com', 'password': 'bench', 'role': 'admin'}).execute()
+    batches('contacts', contacts, lambda i: {
+        'nom': f'Contact{i}', 'email': f'contact{i}@example.com', 'sujet': 'Demande',
+        'message': 'Bonjour ' * 30, 'date_contact': (start + timedelta(minutes=i)).isoformat(),
+        'traite': False
+    })
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    """
+    PNG RVB valide (dégradé) : décodable par le pipeline de variantes d'images
+    """
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    raw = b''.join(
+        b'\x00' + bytes(((x + y) % 256, x % 256, y % 256)[c] for x in range(width) for c in range(3))
+        for y in range(height)
+    )
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw))
+            + chunk(b'IEND', b''))
+
+
+def build_scenarios(args, flask_app, client):
+    """
+    Liste des scénarios : (nom, groupe, méthode, fabrique d'arguments, nb de requêtes
+    [, statuts attendus]). La fabrique prépare au besoin les données de la
+    requête (ligne à supprimer, session d'upload...) hors chronométrage.
+    """
+    import upload as upload_module
+
+    upload_bytes = b'%PDF-1.4\n' + os.urandom(max(int(args.upload_mb * 1024 * 1024) - 9, 1))
+    image_bytes = png_bytes(640, 480)
+    dedup_bytes = b'%PDF-1.4\n' + os.urandom(64 * 1024)
+    csv_body = 'nom,prenom,email,poste_souhaite\n' + ''.join(
+        f'Bulk{i},P,bulk{i}@example.com,Dev\n' for i in range(100)
+    )
+    n = args.requests
+    few = max(n // 10, 5)
+
+    def rand_id(total):
+        return lambda: random.randint(1, max(total, 1))
+
+    cand_id = rand_id(args.candidatures)
+    job_id = rand_id(args.jobs)
+
+    def new_row(table, row):
+        return client.table(table).insert(row).execute().data[0]['id']
+
+    def uploaded_paths(count):
+        test_client = flask_app.test_client()
+        return [
+            test_client.post('/upload-file', data={
+                'file': (io.BytesIO(b'%PDF-1.4\n' + os.urandom(4096)), 'bench.pdf', 'application/pdf')
+            }, content_type='multipart/form-data').get_json()['storage_path']
+            for _ in range(count)
+        ]
+
+    def new_session(size):
+        return flask_app.test_client().post('/upload-sessions', json={
+            'filename': 'bench.pdf', 'size': size, 'content_type': 'application/pdf'
+        }).get_json()['upload_id']
+
+    def new_delete_job():
+        return flask_app.test_client().post('/delete-files', json={
+            'storage_paths': ['pdf/bench-missing.pdf']
+        }).get_json()['job_id']
+
+    candidature_row = {'nom': 'Bench', 'prenom': 'B', 'email': 'bench@example.com', 'statut': 'En attente'}
+    # Objet servi par /local-storage (backend local)
+    local_object = f"{upload_module.BUCKET_NAME}/{uploaded_paths(1)[0]}"
+
+    job_body = {
+        'titre_fr': 'Offre bench', 'titre_en': 'Bench job', 'description_fr': 'Description',
+        'type_contrat': 'CDI', 'localisation': 'Alger', 'competences': ['Python']
+    }
+
+    return [
+        ('index', 'api', 'get', lambda: ('/', {}), n),
+        ('health', 'api', 'get', lambda: ('/health', {}), n),
+        ('metrics', 'api', 'get', lambda: ('/metrics', {}), n),
+        ('local_storage_object', 'api', 'get', lambda: (f'/local-storage/{local_object}', {}), n),
+        ('login', 'api', 'post', lambda: ('/api/auth/login', {'json': {
+            'email': 'admin@example.com', 'password': 'bench'
+        }}), n),
+        ('list_candidatures', 'api', 'get', lambda: ('/api/candidatures', {}), n),
+        ('list_candidatures_projection', 'api', 'get',
+         lambda: ('/api/candidatures?limit=200&fields=nom,prenom,email', {}), n),
+        ('get_candidature', 'api', 'get', lambda: (f'/api/candidatures/{cand_id()}', {}), n),
+        ('create_candidature', 'api', 'post', lambda: ('/api/candidatures', {'json': {
+            'nom': 'Bench', 'prenom': 'B', 'email': 'bench@example.com', 'poste_souhaite': 'Dev'
+        }}), n),
+        ('update_candidature', 'api', 'put',
+         lambda: (f'/api/candidatures/{cand_id()}', {'json': {'statut': 'En cours'}}), n),
+        ('delete_candidature', 'api', 'delete',
+         lambda: (f"/api/candidatures/{new_row('candidatures', candidature_row)}", {}), few),
+        ('bulk_candidatures_100', 'api', 'post', lambda: ('/api/candidatures/bulk', {
+            'data': csv_body, 'content_type': 'text/csv'
+        }), few),
+        ('export_candidatures_ndjson', 'api', 'get',
+         lambda: ('/api/candidatures/export?format=ndjson', {}), max(few // 5, 2)),
+        ('list_jobs', 'api', 'get', lambda: ('/api/jobs', {}), n),
+        ('get_job', 'api', 'get', lambda: (f'/api/jobs/{job_id()}', {}), n),
+        ('create_job', 'api', 'post', lambda: ('/api/jobs', {'json': job_body}), few),
+        ('update_job', 'api', 'put', lambda: (f'/api/jobs/{job_id()}', {'json': {'localisation': 'Oran'}}), few),
+        ('delete_job', 'api', 'delete',
+         lambda: (f"/api/jobs/{new_row('jobs', dict(job_body, statut='inactive'))}", {}), few),
+        ('list_contacts', 'api', 'get', lambda: ('/api/contacts', {}), n),
+        ('create_contact', 'api', 'post', lambda: ('/api/contacts', {'json': {
+            'nom': 'Bench', 'email': 'bench@example.com', 'sujet': 'S', 'message': 'M'
+        }}), n),
+        ('export_contacts_ndjson', 'api', 'get',
+         lambda: ('/api/contacts/export?format=ndjson', {}), max(few // 5, 2)),
+        ('ingest_status', 'api', 'get', lambda: ('/api/ingest/status', {}), n),
+        ('stats', 'api', 'get', lambda: ('/api/stats', {}), n),
+        ('upload_file', 'upload', 'post', lambda: ('/upload-file', {'data': {
+            'file': (io.BytesIO(upload_bytes), 'bench.pdf', 'application/pdf')
+        }, 'content_type': 'multipart/form-data'}), few),
+        ('upload_file_dedup', 'upload', 'post', lambda: ('/upload-file', {'data': {
+            'file': (io.BytesIO(dedup_bytes), 'bench.pdf', 'application/pdf'), 'dedup': '1'
+        }, 'content_type': 'multipart/form-data'}), few),
+        ('upload_file_rejected_magic', 'upload', 'post', lambda: ('/upload-file', {'data': {
+            'file': (io.BytesIO(image_bytes), 'bench.pdf', 'application/pdf')
+        }, 'content_type': 'multipart/form-data'}), few, (400,)),
+        ('upload_session_too_large', 'upload', 'post', lambda: ('/upload-sessions', {
+            'data': '{"filename": "' + 'x' * (3 * 1024 * 1024) + '"}', 'content_type': 'application/json'
+        }), few, (413,)),
+        ('upload_image_variants', 'upload', 'post', lambda: ('/upload-file', {'data': {
+            'file': (io.BytesIO(image_bytes), 'bench.png', 'image/png')
+        }, 'content_type': 'multipart/form-data'}), few),
+        ('upload_multiple_10_images', 'upload', 'post', lambda: ('/upload-multiple', {'data': {
+            'files': [(io.BytesIO(image_bytes), f'img{i}.png', 'image/png') for i in range(10)]
+        }, 'content_type': 'multipart/form-data'}), few),
+        ('upload_session_create', 'upload', 'post', lambda: ('/upload-sessions', {'json': {
+            'filename': 'bench.pdf', 'size': len(upload_bytes), 'content_type': 'application/pdf'
+        }}), few),
+        ('upload_session_status', 'upload', 'get',
+         lambda: (f'/upload-sessions/{new_session(len(upload_bytes))}', {}), few),
+        ('upload_session_chunk_complete', 'upload', 'patch',
+         lambda: (f'/upload-sessions/{new_session(len(upload_bytes))}', {
+             'data': upload_bytes, 'headers': {'Upload-Offset': '0'},
+             'content_type': 'application/offset+octet-stream'
+         }), few),
+        ('upload_session_abort', 'upload', 'delete',
+         lambda: (f'/upload-sessions/{new_session(len(upload_bytes))}', {}), few),
+        ('list_files', 'upload', 'get', lambda: ('/list-files?folder=pdf', {}), n),
+        ('list_files_recursive', 'upload', 'get', lambda: ('/list-files?recursive=1&limit=200', {}), n),
+        ('delete_file', 'upload', 'delete',
+         lambda: ('/delete-file', {'json': {'storage_path': uploaded_paths(1)[0]}}), few),
+        ('delete_files_5', 'upload', 'post',
+         lambda: ('/delete-files', {'json': {'storage_paths': uploaded_paths(5)}}), few),
+        ('delete_job_status', 'upload', 'get', lambda: (f'/delete-jobs/{new_delete_job()}', {}), few),
+        ('upload_stats', 'upload', 'get', lambda: ('/upload-stats', {}), n),
+        ('upload_health', 'upload', 'get', lambda: ('/upload-health', {}), n),
+    ]
+
+
+def is_expected(status_code: int, expected=None) -> bool:
+    """
+    Réponse conforme : statut attendu du scénario, sinon 2xx ou 304
+    """
+    if expected:
+        return status_code in expected
+    return 200 <= status_code < 300 or status_code == 304
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_scenario(flask_app, method, make_request, total, concurrency, expected=None):
+    """
+    Exécute `total` requêtes avec `concurrency` threads ; toute réponse hors
+    des statuts attendus compte comme une erreur. Les requêtes sont préparées
+    d'abord : débit et latences ne couvrent que les appels client
+    Returns: dict de métriques (latences en ms)
+    """
+    # Requêtes préparées avant le chronométrage : seul l'appel client est mesuré
+    prepared = [make_request() for _ in range(total)]
+
+    def one(request_args):
+        client = flask_app.test_client()
+        path, kwargs = request_args
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        response.get_data()
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, prepared))
+    elapsed = time.perf_counter() - started
+
+    latencies = [r[0] for r in results]
+    errors = sum(1 for r in results if not is_expected(r[1], expected))
+    return {
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare le p95 et le débit à la référence
+    Returns: liste des régressions
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance / 100):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance / 100):
+            regressions.append(f"{name}: débit {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark des endpoints AE2I')
+    parser.add_argument('--candidatures', type=int, default=10000)
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--contacts', type=int, default=5000)
+    parser.add_argument('--upload-mb', type=float, default=1.0, help='taille du fichier de /upload-file')
+    parser.add_argument('--requests', type=int, default=100, help='requêtes par scénario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--only', help='filtre sur le nom ou le groupe (api, upload)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=20.0, help='régression tolérée en %%')
+    parser.add_argument('--baseline-file', default=BASELINE_FILE)
+    parser.add_argument('--output', help='écrit les résultats JSON dans ce fichier')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='ae2i-bench-')
+    configure_environment(workdir)
+
+    import logging
+    logging.disable(logging.INFO)
+
+    import app as app_module
+    import upload as upload_module
+    if 'upload' not in app_module.app.blueprints:
+        app_module.app.register_blueprint(upload_module.upload_bp)
+
+    print(f"Jeu de données: {args.candidatures} candidatures, {args.jobs} offres, {args.contacts} contacts")
+    seed(app_module.supabase, args.candidatures, args.jobs, args.contacts)
+
+    results = {}
+    print(f"{'scénario':<32}{'req':>6}{'err':>5}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, group, method, make_request, total, *expected in build_scenarios(args, app_module.app, app_module.supabase):
+        if args.only and args.only not in (name, group) and args.only not in name:
+            continue
+        metrics = run_scenario(app_module.app, method, make_request, total, args.concurrency, *expected)
+        results[name] = metrics
+        print(f"{name:<32}{metrics['requests']:>6}{metrics['errors']:>5}{metrics['throughput_rps']:>10}"
+              f"{metrics['p50_ms']:>10}{metrics['p95_ms']:>10}{metrics['p99_ms']:>10}")
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('save_baseline', 'compare', 'output', 'baseline_file')},
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Référence enregistrée: {args.baseline_file}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline_file):
+            print(f"Aucune référence trouvée: {args.baseline_file}")
+            return 1
+        with open(args.baseline_file) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Régressions détectées:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("Aucune régression par rapport à la référence")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Cache mémoire en lecture (read-through) pour AE2I
+Cache TTL + LRU thread-safe, avec chargement unique par clé
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache clé/valeur en mémoire du worker avec expiration et éviction LRU.
+    Un seul chargement à la fois par clé : les requêtes concurrentes sur une
+    clé absente attendent le résultat au lieu de solliciter la base.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._generation = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Retourne la valeur en cache ou None si absente/expirée
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Enregistre une valeur pour la durée du TTL
+        """
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Lecture traversante : charge et met en cache si la clé est absente.
+        Les valeurs None ne sont pas mises en cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            value = self.get(key)
+            if value is None:
+                with self._lock:
+                    generation = self._generation
+                value = loader()
+                # Une invalidation pendant le chargement rend la valeur obsolète
+                if value is not None:
+                    with self._lock:
+                        if generation == self._generation:
+                            self._store(key, value)
+
+        with self._lock:
+            if not key_lock.locked():
+                self._key_locks.pop(key, None)
+
+        return value
+
+    def invalidate(self, key: Hashable):
+        """
+        Supprime une clé du cache
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """
+        Supprime toutes les clés qui satisfont le prédicat
+        """
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+            self._generation += 1
+
+    def clear(self):
+        """
+        Vide entièrement le cache
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+class FreshnessProbe:
+    """
+    Détection des écritures faites par les autres workers.
+    Au plus une fois par `interval` secondes, `load_version` lit une version
+    peu coûteuse de la source (ex. nombre de lignes + dernière modification) ;
+    si elle a changé depuis la dernière sonde, `on_change` vide le cache local.
+    """
+
+    def __init__(self, load_version: Callable[[], Any], on_change: Callable[[], None], interval: float):
+        self.load_version = load_version
+        self.on_change = on_change
+        self.interval = interval
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        """
+        Sonde la source si le délai est écoulé (une seule sonde à la fois)
+        """
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            version = self.load_version()
+            if self._version is not None and version != self._version:
+                self.on_change()
+            self._version = version
+            self._checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def expire(self):
+        """
+        Force une sonde à la prochaine lecture (après une écriture locale)
+        """
+        self._checked_at = None
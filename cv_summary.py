@@ -0,0 +1,292 @@
+"""
+Génération des résumés PDF de candidature pour AE2I
+Produit une fiche PDF (données du candidat + informations sur le CV
+uploadé) dans un pool de processus, et la met en cache sur disque sous
+UPLOADS_DIR, nommée d'après un hash du contenu des entrées : un nouveau
+téléchargement sert le fichier existant, une modification des données
+reconstruit la fiche.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+import textwrap
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "1"))
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "30"))
+# Incrémenter pour invalider toutes les fiches après un changement de mise en page
+SUMMARY_LAYOUT_VERSION = 1
+
+# Champs repris dans la fiche (et dans la clé de cache), par table source
+SUMMARY_FIELDS = {
+    'candidates': [
+        ('full_name', 'Nom'), ('email', 'Email'), ('phone', 'Téléphone'),
+        ('position', 'Poste'), ('linkedin_url', 'LinkedIn'), ('skills', 'Compétences'),
+        ('status', 'Statut'), ('created_at', 'Créé le'), ('updated_at', 'Mis à jour le'),
+    ],
+    'candidatures': [
+        ('nom', 'Nom'), ('prenom', 'Prénom'), ('email', 'Email'), ('telephone', 'Téléphone'),
+        ('poste_souhaite', 'Poste souhaité'), ('annees_experience', "Années d'expérience"),
+        ('en_poste', 'En poste'), ('statut', 'Statut'), ('date_candidature', 'Date de candidature'),
+    ],
+}
+LONG_TEXT_FIELDS = {'candidatures': ('lettre_motivation', 'Lettre de motivation')}
+
+# Mise en page A4 (points), Helvetica
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 56
+LINE_HEIGHT = 14
+WRAP_COLUMNS = 95
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+_pool = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+class SummaryTimeout(Exception):
+    """Fiche non générée dans les SUMMARY_TIMEOUT secondes"""
+
+
+# ========== RENDU PDF (PROCESSUS DU POOL) ==========
+
+def _pdf_text(value: str) -> str:
+    """Chaîne littérale PDF (WinAnsi) : échappement et accents en octal"""
+    encoded = value.encode('cp1252', 'replace')
+    out = []
+    for byte in encoded:
+        char = chr(byte)
+        if char in '()\\':
+            out.append('\\' + char)
+        elif byte < 32 or byte > 126:
+            out.append(f'\\{byte:03o}')
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+def _layout(title: str, sections: List[Tuple[str, List[str]]]) -> List[List[Tuple[str, str]]]:
+    """
+    Découpe le contenu en pages de lignes (police, texte)
+    """
+    lines = [('F2', title), ('F1', '')]
+    for heading, body in sections:
+        lines.append(('F2', heading))
+        for paragraph in body:
+            wrapped = textwrap.wrap(paragraph, WRAP_COLUMNS) or ['']
+            lines.extend(('F1', line) for line in wrapped)
+        lines.append(('F1', ''))
+    return [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+
+def build_pdf(title: str, sections: List[Tuple[str, List[str]]]) -> bytes:
+    """
+    PDF texte minimal (Helvetica, A4), sans dépendance externe
+    """
+    pages = _layout(title, sections)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # arbre des pages, complété plus bas
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for number, page in enumerate(pages, start=1):
+        commands = ['BT', f'{MARGIN} {PAGE_HEIGHT - MARGIN} Td', f'{LINE_HEIGHT} TL']
+        for font, text in page:
+            commands.append(f'/{font} {12 if font == "F2" else 10} Tf ({_pdf_text(text)}) \'')
+        commands.append('ET')
+        commands.append(f'BT /F1 8 Tf {PAGE_WIDTH - MARGIN - 40} {MARGIN // 2} Td '
+                        f'({number}/{len(pages)}) Tj ET')
+        stream = '\n'.join(commands).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = ' '.join(f'{i} 0 R' for i in page_ids).encode('ascii')
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % index + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def _format_value(value) -> str:
+    if value is None or value == '':
+        return '-'
+    if isinstance(value, bool):
+        return 'Oui' if value else 'Non'
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value) or '-'
+    return str(value)
+
+
+def render_summary(table: str, record: dict, cv_info: Optional[dict]) -> bytes:
+    """
+    Exécuté dans un processus du pool : fiche PDF d'une candidature
+    """
+    identity = record.get('full_name') or ' '.join(
+        str(record[k]) for k in ('prenom', 'nom') if record.get(k)
+    ) or 'Candidat'
+    details = [f"{label} : {_format_value(record.get(field))}" for field, label in SUMMARY_FIELDS[table]]
+    sections = [('Informations', details)]
+
+    if cv_info:
+        cv_lines = [f"Fichier : {cv_info['name']}", f"Taille : {cv_info['size']} octets"]
+        if cv_info.get('pages'):
+            cv_lines.append(f"Pages : {cv_info['pages']}")
+        if cv_info.get('url'):
+            cv_lines.append(f"Lien : {cv_info['url']}")
+        sections.append(('CV joint', cv_lines))
+    else:
+        sections.append(('CV joint', ['Aucun CV fourni']))
+
+    if table in LONG_TEXT_FIELDS:
+        field, label = LONG_TEXT_FIELDS[table]
+        if record.get(field):
+            sections.append((label, str(record[field]).splitlines()))
+
+    sections.append(('', [f"Fiche générée le {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC"]))
+    return build_pdf(f"Résumé de candidature - {identity}", sections)
+
+
+# ========== CACHE ET POOL ==========
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processus du conteneur courant (recréé après un fork)
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=SUMMARY_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    """
+    Oublie un pool cassé : le prochain appel à get_pool() en recrée un
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def summary_key(table: str, record: dict, cv_identity: Optional[str]) -> str:
+    """
+    Hash du contenu des entrées : champs affichés + identité du CV
+    """
+    fields = [field for field, _ in SUMMARY_FIELDS[table]]
+    if table in LONG_TEXT_FIELDS:
+        fields.append(LONG_TEXT_FIELDS[table][0])
+    payload = {
+        'layout': SUMMARY_LAYOUT_VERSION,
+        'table': table,
+        'record': {field: record.get(field) for field in fields},
+        'cv': cv_identity
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def cv_page_count(path: str) -> Optional[int]:
+    """
+    Estimation du nombre de pages d'un PDF (objets /Type /Page)
+    """
+    try:
+        with open(path, 'rb') as f:
+            return len(re.findall(rb'/Type\s*/Page(?!s)', f.read())) or None
+    except OSError:
+        return None
+
+
+def describe_cv(cv_url: Optional[str], uploads_dir: str) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Identité (pour la clé de cache) et description du CV.
+    Un CV présent dans uploads_dir est identifié par taille + date de
+    modification ; un CV distant par son URL (chemins de storage uniques).
+    Returns: (identité, infos)
+    """
+    if not cv_url:
+        return None, None
+    name = os.path.basename(cv_url.split('?')[0])
+    local_path = os.path.join(uploads_dir, name)
+    if name and os.path.isfile(local_path):
+        stat = os.stat(local_path)
+        info = {'name': name, 'size': stat.st_size, 'pages': cv_page_count(local_path), 'url': cv_url}
+        return f"{name}:{stat.st_size}:{stat.st_mtime_ns}", info
+    return cv_url, {'name': name or cv_url, 'size': '?', 'url': cv_url}
+
+
+def get_summary(table: str, record: dict, uploads_dir: str) -> str:
+    """
+    Chemin de la fiche PDF, générée si elle n'est pas déjà en cache.
+    Les versions précédentes de la fiche du même enregistrement sont supprimées.
+    Raises: SummaryTimeout si le rendu dépasse SUMMARY_TIMEOUT
+    """
+    cv_identity, cv_info = describe_cv(record.get('cv_url'), uploads_dir)
+    key = summary_key(table, record, cv_identity)
+    prefix = f"summary_{table}_{record['id']}_"
+    filename = f"{prefix}{key}.pdf"
+    path = os.path.join(uploads_dir, filename)
+
+    if os.path.isfile(path):
+        return path
+
+    os.makedirs(uploads_dir, exist_ok=True)
+    future = None
+    try:
+        pool = get_pool()
+        future = pool.submit(render_summary, table, record, cv_info)
+        content = future.result(timeout=SUMMARY_TIMEOUT)
+    except FutureTimeoutError:
+        # Rendu encore en file : retiré ; déjà en cours : son résultat est ignoré
+        future.cancel()
+        raise SummaryTimeout(f"Résumé {table}/{record['id']} non généré en {SUMMARY_TIMEOUT:g}s")
+    except (OSError, NotImplementedError, BrokenExecutor) as e:
+        if isinstance(e, BrokenExecutor):
+            discard_pool(pool)
+        # Environnements sans multiprocessing (ex. /dev/shm absent) : rendu local
+        logger.warning(f"Pool de génération indisponible, rendu en ligne: {str(e)}")
+        content = render_summary(table, record, cv_info)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(uploads_dir):
+        if name.startswith(prefix) and name != filename and name.endswith('.pdf'):
+            try:
+                os.remove(os.path.join(uploads_dir, name))
+            except OSError:
+                pass
+    logger.info(f"Résumé généré: {filename}")
+    return path
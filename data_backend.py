@@ -0,0 +1,604 @@
+"""
+Backend de données pour AE2I
+Fabrique du client utilisé par app.py et les blueprints d'upload :
+- "supabase" (par défaut) : client Supabase officiel
+- "local" : remplaçant SQLite + système de fichiers qui reproduit le
+  sous-ensemble du query builder PostgREST et de Storage utilisé par l'API,
+  pour profiler les endpoints et les exécuter en CI sans réseau.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", os.path.join("uploads", "local_backend.db"))
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join("uploads", "local_storage"))
+LOCAL_PUBLIC_URL = os.getenv("LOCAL_PUBLIC_URL", "http://localhost:5000/local-storage")
+
+
+def create_backend(url: str, key: str, http_client=None):
+    """
+    Retourne le client de données configuré par DATA_BACKEND
+    (http_client : client httpx partagé par PostgREST et Storage)
+    """
+    if DATA_BACKEND == "local":
+        logger.info(f"Backend local: {LOCAL_DB_PATH} / {LOCAL_STORAGE_DIR}")
+        return LocalBackend(LOCAL_DB_PATH, LOCAL_STORAGE_DIR, LOCAL_PUBLIC_URL)
+
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+    if http_client is None:
+        return create_client(url, key)
+    return create_client(url, key, options=SyncClientOptions(httpx_client=http_client))
+
+
+class LocalAPIError(Exception):
+    """
+    Erreur levée par le backend local (équivalent de postgrest.APIError)
+    """
+
+
+class LocalResponse:
+    """
+    Réponse d'exécution : mêmes attributs que postgrest.APIResponse
+    """
+
+    def __init__(self, data: List[dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+# ========== TABLES ==========
+
+OPERATORS = {
+    'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+}
+
+# Compteurs maintenus par trigger côté Postgres (voir la migration
+# add_media_uploads_rollups) : table source -> (table cumulée, table journalière)
+ROLLUP_TABLES = {
+    'media_uploads': ('media_upload_rollups', 'media_upload_daily_rollups'),
+}
+ROLLUP_KEYS = ('file_type', 'category', 'status')
+
+# Tables dont updated_at est maintenu par le trigger update_updated_at_column
+UPDATED_AT_TABLES = {'candidates', 'site_settings', 'jobs'}
+
+
+def _column(name: str) -> str:
+    if not name.replace('_', '').isalnum():
+        raise LocalAPIError(f"Nom de colonne invalide: {name}")
+    return f"json_extract(data, '$.{name}')"
+
+
+def _coerce(value: str) -> Any:
+    """
+    Convertit une valeur textuelle de filtre PostgREST en type SQLite
+    """
+    if value == 'null':
+        return None
+    if value in ('true', 'false'):
+        return 1 if value == 'true' else 0
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _sql_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """
+    Découpe "a,b,and(c,d)" sur les virgules hors parenthèses et guillemets
+    """
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(expr: str, joiner: str) -> tuple:
+    """
+    Traduit un arbre logique PostgREST (or=(...)) en clause SQL
+    """
+    clauses, params = [], []
+    for part in _split_top_level(expr):
+        part = part.strip()
+        for group, group_joiner in (('and(', ' AND '), ('or(', ' OR ')):
+            if part.startswith(group) and part.endswith(')'):
+                sql, sub_params = _parse_logic(part[len(group):-1], group_joiner)
+                clauses.append(f"({sql})")
+                params.extend(sub_params)
+                break
+        else:
+            column, op, value = part.split('.', 2)
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1]
+            else:
+                value = _coerce(value)
+            if op == 'is':
+                clauses.append(f"{_column(column)} IS NULL" if value is None
+                               else f"{_column(column)} IS ?")
+                if value is not None:
+                    params.append(value)
+            elif op in OPERATORS:
+                clauses.append(f"{_column(column)} {OPERATORS[op]} ?")
+                params.append(value)
+            else:
+                raise LocalAPIError(f"Opérateur non supporté: {op}")
+    return joiner.join(clauses), params
+
+
+class LocalQuery:
+    """
+    Query builder chaînable reproduisant l'API postgrest-py utilisée
+    """
+
+    def __init__(self, backend: 'LocalBackend', table: str):
+        self.backend = backend
+        self.table = table
+        self.action = 'select'
+        self.columns = ['*']
+        self.payload = None
+        self.count_method = None
+        self.head = False
+        self.on_conflict = ''
+        self.where: List[str] = []
+        self.params: List[Any] = []
+        self.orders: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # --- actions ---
+
+    def select(self, *columns, count=None, head=None):
+        self.action = 'select'
+        cols = ','.join(columns) if columns else '*'
+        self.columns = [c.strip() for c in cols.split(',') if c.strip()] or ['*']
+        self.count_method = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, json_data, *, count=None, returning=None, upsert=False, default_to_null=True):
+        self.action = 'upsert' if upsert else 'insert'
+        self.payload = json_data
+        self.count_method = count
+        return self
+
+    def upsert(self, json_data, *, count=None, returning=None, ignore_duplicates=False,
+               on_conflict='', default_to_null=True):
+        self.action = 'upsert'
+        self.payload = json_data
+        self.on_conflict = on_conflict
+        self.count_method = count
+        return self
+
+    def update(self, json_data, *, count=None, returning=None):
+        self.action = 'update'
+        self.payload = json_data
+        self.count_method = count
+        return self
+
+    def delete(self, *, count=None, returning=None):
+        self.action = 'delete'
+        self.count_method = count
+        return self
+
+    # --- filtres ---
+
+    def _filter(self, column: str, op: str, value: Any):
+        self.where.append(f"{_column(column)} {OPERATORS[op]} ?")
+        self.params.append(_sql_value(value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def is_(self, column, value):
+        if value in (None, 'null'):
+            self.where.append(f"{_column(column)} IS NULL")
+        else:
+            self.where.append(f"{_column(column)} IS ?")
+            self.params.append(_coerce(str(value).lower()))
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.where.append("0")
+            return self
+        self.where.append(f"{_column(column)} IN ({','.join('?' * len(values))})")
+        self.params.extend(_sql_value(v) for v in values)
+        return self
+
+    def or_(self, filters, reference_table=None):
+        sql, params = _parse_logic(filters, ' OR ')
+        self.where.append(f"({sql})")
+        self.params.extend(params)
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        direction = 'DESC' if desc else 'ASC'
+        # Défaut Postgres : NULLS FIRST en DESC, NULLS LAST en ASC
+        if nullsfirst is None:
+            nullsfirst = desc
+        self.orders.append(f"{_column(column)} {direction} NULLS {'FIRST' if nullsfirst else 'LAST'}")
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self._limit = size
+        return self
+
+    def offset(self, size):
+        self._offset = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    # --- exécution ---
+
+    def _where_sql(self) -> str:
+        clauses = ["table_name = ?"] + self.where
+        return " AND ".join(clauses)
+
+    def _project(self, row: dict) -> dict:
+        if '*' in self.columns:
+            return row
+        return {c: row.get(c) for c in self.columns}
+
+    def execute(self) -> LocalResponse:
+        with self.backend.lock:
+            conn = self.backend.conn
+            if self.action == 'select':
+                return self._execute_select(conn)
+            if self.action in ('insert', 'upsert'):
+                return self._execute_insert(conn)
+            if self.action == 'update':
+                return self._execute_update(conn)
+            return self._execute_delete(conn)
+
+    def _matching(self, conn, with_paging: bool = True) -> List[tuple]:
+        sql = f"SELECT rowid, data FROM rows WHERE {self._where_sql()}"
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(self.orders)
+        else:
+            sql += " ORDER BY rowid"
+        if with_paging and (self._limit is not None or self._offset is not None):
+            sql += " LIMIT ? OFFSET ?"
+            params = [self.table] + self.params + [
+                self._limit if self._limit is not None else -1, self._offset or 0
+            ]
+        else:
+            params = [self.table] + self.params
+        return conn.execute(sql, params).fetchall()
+
+    def _execute_select(self, conn) -> LocalResponse:
+        count = None
+        if self.count_method:
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM rows WHERE {self._where_sql()}",
+                [self.table] + self.params
+            ).fetchone()[0]
+        if self.head:
+            return LocalResponse([], count)
+        rows = [self._project(json.loads(data)) for _, data in self._matching(conn)]
+        return LocalResponse(rows, count)
+
+    def _execute_insert(self, conn) -> LocalResponse:
+        records = self.payload if isinstance(self.payload, list) else [self.payload]
+        conflict_keys = [k.strip() for k in self.on_conflict.split(',') if k.strip()] or ['id']
+        inserted = []
+        for record in records:
+            row = dict(record)
+            if 'id' not in row or row['id'] is None:
+                row['id'] = self.backend.next_id(self.table)
+            row.setdefault('created_at', datetime.utcnow().isoformat() + '+00:00')
+            if self.table in UPDATED_AT_TABLES:
+                row.setdefault('updated_at', row['created_at'])
+
+            existing = None
+            if self.action == 'upsert' or 'id' in record:
+                existing = conn.execute(
+                    "SELECT rowid, data FROM rows WHERE table_name = ? AND " + " AND ".join(
+                        f"{_column(k)} = ?" for k in conflict_keys
+                    ),
+                    [self.table] + [_sql_value(row.get(k)) for k in conflict_keys]
+                ).fetchone()
+            if existing and self.action != 'upsert':
+                raise LocalAPIError(f"duplicate key value violates unique constraint ({self.table})")
+            if existing:
+                merged = dict(json.loads(existing[1]), **row)
+                conn.execute("UPDATE rows SET data = ? WHERE rowid = ?",
+                             (json.dumps(merged, default=str), existing[0]))
+                inserted.append(merged)
+            else:
+                conn.execute("INSERT INTO rows (table_name, data) VALUES (?, ?)",
+                             (self.table, json.dumps(row, default=str)))
+                self.backend.apply_rollups(self.table, row, 1)
+                inserted.append(row)
+        conn.commit()
+        return LocalResponse(inserted, len(inserted) if self.count_method else None)
+
+    def _execute_update(self, conn) -> LocalResponse:
+        updated = []
+        for rowid, data in self._matching(conn, with_paging=False):
+            row = dict(json.loads(data), **self.payload)
+            if self.table in UPDATED_AT_TABLES:
+                row['updated_at'] = datetime.utcnow().isoformat() + '+00:00'
+            conn.execute("UPDATE rows SET data = ? WHERE rowid = ?",
+                         (json.dumps(row, default=str), rowid))
+            updated.append(row)
+        conn.commit()
+        return LocalResponse(updated, len(updated) if self.count_method else None)
+
+    def _execute_delete(self, conn) -> LocalResponse:
+        matching = self._matching(conn, with_paging=False)
+        conn.executemany("DELETE FROM rows WHERE rowid = ?", [(r,) for r, _ in matching])
+        deleted = [json.loads(data) for _, data in matching]
+        for row in deleted:
+            self.backend.apply_rollups(self.table, row, -1)
+        conn.commit()
+        return LocalResponse(deleted, len(deleted) if self.count_method else None)
+
+
+# ========== STORAGE ==========
+
+class LocalBucketInfo:
+    """
+    Description d'un bucket (attributs utilisés de storage3.SyncBucket)
+    """
+
+    def __init__(self, name: str, public: bool = True):
+        self.id = name
+        self.name = name
+        self.public = public
+
+
+class LocalBucket:
+    """
+    Bucket stocké sous forme de dossier : API de storage3 SyncBucketProxy
+    """
+
+    def __init__(self, storage: 'LocalStorage', bucket_id: str):
+        self.storage = storage
+        self.id = bucket_id
+        self.root = os.path.join(storage.root, bucket_id)
+
+    def _path(self, path: str) -> str:
+        root = os.path.realpath(self.root)
+        full = os.path.realpath(os.path.join(root, path.lstrip('/')))
+        # commonpath : un dossier voisin (<bucket>-autre/) ne passe pas
+        if os.path.commonpath([full, root]) != root:
+            raise LocalAPIError(f"Chemin invalide: {path}")
+        return full
+
+    def upload(self, path: str, file, file_options: Optional[dict] = None):
+        if not os.path.isdir(self.root):
+            raise LocalAPIError(f"Bucket not found: {self.id}")
+        target = self._path(path)
+        upsert = str((file_options or {}).get('upsert', 'false')).lower() == 'true'
+        if os.path.exists(target) and not upsert:
+            raise LocalAPIError(f"The resource already exists: {path}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if isinstance(file, (bytes, bytearray)):
+            with open(target, 'wb') as f:
+                f.write(file)
+        elif isinstance(file, (str, os.PathLike)):
+            shutil.copyfile(file, target)
+        else:
+            with open(target, 'wb') as f:
+                shutil.copyfileobj(file, f)
+        return {'path': path, 'full_path': f"{self.id}/{path}"}
+
+    def update(self, path: str, file, file_options: Optional[dict] = None):
+        return self.upload(path, file, dict(file_options or {}, upsert='true'))
+
+    def download(self, path: str, options: Optional[dict] = None) -> bytes:
+        target = self._path(path)
+        if not os.path.isfile(target):
+            raise LocalAPIError(f"Object not found: {path}")
+        with open(target, 'rb') as f:
+            return f.read()
+
+    def exists(self, path: str) -> bool:
+        return os.path.isfile(self._path(path))
+
+    def get_public_url(self, path: str, options: Optional[dict] = None) -> str:
+        return f"{self.storage.public_url}/{self.id}/{path.lstrip('/')}"
+
+    def create_signed_url(self, path: str, expires_in: int, options: Optional[dict] = None) -> dict:
+        if not self.exists(path):
+            raise LocalAPIError(f"Object not found: {path}")
+        expires = int((datetime.utcnow() + timedelta(seconds=expires_in)).timestamp())
+        url = f"{self.get_public_url(path)}?token={uuid.uuid4().hex}&expires={expires}"
+        return {'signedURL': url, 'signedUrl': url}
+
+    def list(self, path: Optional[str] = None, options: Optional[dict] = None) -> List[dict]:
+        options = options or {}
+        directory = self._path(path or '')
+        if not os.path.isdir(directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(directory)):
+            full = os.path.join(directory, name)
+            if os.path.isdir(full):
+                entries.append({'name': name, 'id': None, 'metadata': None,
+                                'created_at': None, 'updated_at': None})
+                continue
+            stat = os.stat(full)
+            timestamp = datetime.utcfromtimestamp(stat.st_mtime).isoformat() + 'Z'
+            entries.append({
+                'name': name,
+                'id': name,
+                'metadata': {'size': stat.st_size},
+                'created_at': timestamp,
+                'updated_at': timestamp
+            })
+        offset = int(options.get('offset', 0))
+        limit = int(options.get('limit', 100))
+        return entries[offset:offset + limit]
+
+    def remove(self, paths: List[str]) -> List[dict]:
+        removed = []
+        for path in paths:
+            target = self._path(path)
+            if os.path.isfile(target):
+                os.remove(target)
+                removed.append({'name': path, 'bucket_id': self.id})
+        return removed
+
+
+class LocalStorage:
+    """
+    Remplaçant de storage3 SyncStorageClient basé sur le système de fichiers
+    """
+
+    def __init__(self, root: str, public_url: str):
+        self.root = root
+        self.public_url = public_url.rstrip('/')
+        os.makedirs(root, exist_ok=True)
+
+    def list_buckets(self) -> List[LocalBucketInfo]:
+        return [LocalBucketInfo(name) for name in sorted(os.listdir(self.root))
+                if os.path.isdir(os.path.join(self.root, name))]
+
+    def get_bucket(self, bucket_id: str) -> LocalBucketInfo:
+        if not os.path.isdir(os.path.join(self.root, bucket_id)):
+            raise LocalAPIError(f"Bucket not found: {bucket_id}")
+        return LocalBucketInfo(bucket_id)
+
+    def create_bucket(self, bucket_id: str, name: Optional[str] = None, options: Optional[dict] = None):
+        os.makedirs(os.path.join(self.root, bucket_id), exist_ok=True)
+        return {'name': bucket_id}
+
+    def delete_bucket(self, bucket_id: str):
+        shutil.rmtree(os.path.join(self.root, bucket_id), ignore_errors=True)
+        return {'message': 'Successfully deleted'}
+
+    def from_(self, bucket_id: str) -> LocalBucket:
+        return LocalBucket(self, bucket_id)
+
+
+# ========== CLIENT ==========
+
+class LocalBackend:
+    """
+    Client local : même interface que supabase.Client pour table() et storage
+    """
+
+    def __init__(self, db_path: str, storage_dir: str, public_url: str = LOCAL_PUBLIC_URL):
+        if db_path != ':memory:' and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "table_name TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_table ON rows(table_name)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rows_id ON rows(table_name, json_extract(data, '$.id'))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sequences (table_name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self.conn.commit()
+        self.storage = LocalStorage(storage_dir, public_url)
+
+    def table(self, table_name: str) -> LocalQuery:
+        return LocalQuery(self, table_name)
+
+    def from_(self, table_name: str) -> LocalQuery:
+        return self.table(table_name)
+
+    def next_id(self, table_name: str) -> int:
+        """
+        Équivalent d'un BIGSERIAL par table
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO sequences (table_name, value) VALUES (?, 1) "
+                "ON CONFLICT(table_name) DO UPDATE SET value = value + 1",
+                (table_name,)
+            )
+            return self.conn.execute(
+                "SELECT value FROM sequences WHERE table_name = ?", (table_name,)
+            ).fetchone()[0]
+
+    def apply_rollups(self, table_name: str, row: dict, sign: int):
+        """
+        Équivalent du trigger de rollup : incrémente (ou décrémente) les
+        compteurs cumulés et journaliers dans la transaction en cours
+        """
+        if table_name not in ROLLUP_TABLES:
+            return
+        totals_table, daily_table = ROLLUP_TABLES[table_name]
+        key = {k: row.get(k) or 'unknown' for k in ROLLUP_KEYS}
+        day = str(row.get('created_at') or datetime.utcnow().isoformat())[:10]
+        size = row.get('size') or 0
+
+        for target, target_key in ((totals_table, key), (daily_table, dict(key, day=day))):
+            where = " AND ".join(f"{_column(k)} = ?" for k in target_key)
+            existing = self.conn.execute(
+                f"SELECT rowid, data FROM rows WHERE table_name = ? AND {where}",
+                [target] + list(target_key.values())
+            ).fetchone()
+            if existing:
+                counters = json.loads(existing[1])
+                counters['uploads'] += sign
+                counters['total_size'] += sign * size
+                self.conn.execute("UPDATE rows SET data = ? WHERE rowid = ?",
+                                  (json.dumps(counters), existing[0]))
+            else:
+                counters = dict(target_key, uploads=sign, total_size=sign * size)
+                self.conn.execute("INSERT INTO rows (table_name, data) VALUES (?, ?)",
+                                  (target, json.dumps(counters)))
@@ -2,21 +2,70 @@
 Netlify Function: Download CV
 FIX: pdf-download
 ADD: secure-cv-access
+ADD: range-conditional-get
+ADD: signed-url-redirect
+ADD: cached-summary
 
 Permet le téléchargement sécurisé des CV PDF (originaux et résumés générés)
 avec vérification de l'existence et protection contre les path traversal.
+Supporte les requêtes partielles (Range) et conditionnelles
+(ETag / Last-Modified -> 304) : seule la plage demandée est lue, via mmap.
+
+Mode « redirect » (CV_DOWNLOAD_MODE=redirect ou ?mode=redirect) : après les
+contrôles d'accès, répond par un 302 vers une URL signée de courte durée du
+bucket ae2i-files ; le fichier ne transite plus par la fonction.
+
+Résumés (?candidate_id=... ou ?candidature_id=...) : la fiche PDF est générée
+par cv_summary et mise en cache sous UPLOADS_DIR, nommée d'après un hash des
+données source ; les téléchargements suivants servent le fichier en cache.
 """
 
 import json
 import os
+import mmap
+import uuid
 import base64
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 from urllib.parse import parse_qs, unquote
 
+from cv_summary import SummaryTimeout, get_summary
+
 # Configuration
 UPLOADS_DIR = '/tmp/uploads'
 ALLOWED_EXTENSIONS = ['.pdf']
 
+# Mode de téléchargement : proxy (octets servis par la fonction) ou redirect
+CV_DOWNLOAD_MODE = os.getenv('CV_DOWNLOAD_MODE', 'proxy')
+CV_BUCKET_NAME = os.getenv('CV_BUCKET_NAME', 'ae2i-files')
+CV_STORAGE_FOLDER = os.getenv('CV_STORAGE_FOLDER', 'pdf')
+CV_SIGNED_URL_TTL = int(os.getenv('CV_SIGNED_URL_TTL', '300'))
+# Une URL en cache est renouvelée un peu avant son expiration
+CV_SIGNED_URL_MARGIN = 30
+
+_signed_urls = None
+
+# Paramètre de requête -> table source des résumés
+SUMMARY_SOURCES = {
+    'candidate_id': 'candidates',
+    'candidature_id': 'candidatures'
+}
+# Type de la clé primaire de chaque table source (uuid / bigint)
+SUMMARY_ID_PARSERS = {
+    'candidates': lambda value: str(uuid.UUID(value)),
+    'candidatures': int
+}
+
+# Lecture/encodage par blocs (multiple de 3 : pas de padding base64 intermédiaire)
+READ_CHUNK_SIZE = 3 * 256 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, Range, If-None-Match, If-Modified-Since, If-Range',
+    'Access-Control-Expose-Headers': 'Content-Disposition, Content-Range, Content-Length, Accept-Ranges, ETag, Last-Modified, Location'
+}
+
 
 def handler(event, context):
     """
@@ -24,26 +73,38 @@ def handler(event, context):
     """
 
     # Vérifier la méthode HTTP
-    if event['httpMethod'] not in ['GET', 'OPTIONS']:
+    if event['httpMethod'] not in ['GET', 'HEAD', 'OPTIONS']:
         return error_response(405, 'Method not allowed. Use GET.')
 
     # Gérer les requêtes OPTIONS (CORS preflight)
     if event['httpMethod'] == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-            },
+            'headers': dict(CORS_HEADERS),
             'body': ''
         }
 
     try:
         # Extraire le paramètre filename de la query string
-        query_params = event.get('queryStringParameters', {})
+        query_params = event.get('queryStringParameters') or {}
+
+        summary_param = next((p for p in SUMMARY_SOURCES if query_params.get(p)), None)
+        if summary_param:
+            table = SUMMARY_SOURCES[summary_param]
+            try:
+                record_id = SUMMARY_ID_PARSERS[table](unquote(query_params[summary_param]).strip())
+            except (ValueError, TypeError):
+                return error_response(400, f'Invalid {summary_param} parameter.')
+            try:
+                filename = summary_filename(table, record_id)
+            except SummaryTimeout as e:
+                print(f"[ERROR] {str(e)}")
+                return error_response(504, 'Summary generation timed out. Please try again.')
+            if filename is None:
+                return error_response(404, 'Candidate not found.')
+            query_params = dict(query_params, filename=filename, mode='proxy')
 
-        if not query_params or 'filename' not in query_params:
+        if 'filename' not in query_params:
             return error_response(400, 'Missing filename parameter.')
 
         filename = unquote(query_params['filename'])
@@ -63,6 +124,15 @@ def handler(event, context):
                 f'Invalid file type. Only PDF files are allowed.'
             )
 
+        # inline=1 : affichage dans le navigateur (les lecteurs PDF utilisent Range)
+        inline = query_params.get('inline') in ('1', 'true')
+
+        mode = query_params.get('mode') or CV_DOWNLOAD_MODE
+        if mode == 'redirect':
+            response = redirect_response(filename, inline)
+            if response:
+                return response
+
         # Construire le chemin complet
         file_path = os.path.join(UPLOADS_DIR, filename)
 
@@ -80,27 +150,56 @@ def handler(event, context):
                 'Access denied. File must be in uploads directory.'
             )
 
-        # Lire le fichier
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        stat = os.stat(real_path)
+        etag = file_etag(stat)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        disposition = 'inline' if inline else 'attachment'
+        headers = dict(CORS_HEADERS, **{
+            'Content-Type': 'application/pdf',
+            'Content-Disposition': f'{disposition}; filename="{filename}"',
+            'Accept-Ranges': 'bytes',
+            'ETag': etag,
+            'Last-Modified': last_modified,
+            'Cache-Control': 'private, no-cache'
+        })
+
+        # Requête conditionnelle : le client a déjà cette version
+        if not_modified(request_headers, etag, stat.st_mtime):
+            print(f"[NOT MODIFIED] {filename}")
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+        size = stat.st_size
+        byte_range = None
+        if 'range' in request_headers and range_applies(request_headers, etag, stat.st_mtime):
+            byte_range = parse_range(request_headers['range'], size)
+            if byte_range == 'unsatisfiable':
+                headers['Content-Range'] = f'bytes */{size}'
+                return {'statusCode': 416, 'headers': headers, 'body': ''}
+
+        status_code = 200
+        start, end = 0, size - 1
+        if byte_range:
+            status_code = 206
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        length = max(end - start + 1, 0)
+        headers['Content-Length'] = str(length)
+
+        if event['httpMethod'] == 'HEAD':
+            return {'statusCode': status_code, 'headers': headers, 'body': ''}
 
-        # Encoder en base64 pour la transmission
-        file_base64 = base64.b64encode(file_content).decode('utf-8')
+        # Lire uniquement la plage demandée, encodée en base64 par blocs
+        file_base64 = read_base64(real_path, start, length)
 
         # Log de succès
-        print(f"[SUCCESS] File downloaded: {filename} ({len(file_content)} bytes)")
+        print(f"[SUCCESS] File downloaded: {filename} ({length}/{size} bytes, {status_code})")
 
         # Retourner le fichier
         return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/pdf',
-                'Content-Disposition': f'attachment; filename="{filename}"',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-                'Access-Control-Expose-Headers': 'Content-Disposition'
-            },
+            'statusCode': status_code,
+            'headers': headers,
             'body': file_base64,
             'isBase64Encoded': True
         }
@@ -120,6 +219,151 @@ def handler(event, context):
         return error_response(500, f'Internal server error: {str(e)}')
 
 
+def summary_filename(table, record_id):
+    """
+    Nom de la fiche résumé en cache (générée si les données ont changé)
+    Returns: None si l'enregistrement n'existe pas
+    """
+    from supabase_client import supabase
+
+    result = supabase.table(table).select('*').eq('id', record_id).limit(1).execute()
+    if not result.data:
+        return None
+    return os.path.basename(get_summary(table, result.data[0], UPLOADS_DIR))
+
+
+def signed_url_cache():
+    """
+    Cache des URL signées, conservé entre les invocations d'un conteneur chaud
+    """
+    global _signed_urls
+    if _signed_urls is None:
+        from cache import TTLCache
+        _signed_urls = TTLCache(max(CV_SIGNED_URL_TTL - CV_SIGNED_URL_MARGIN, 1))
+    return _signed_urls
+
+
+def create_signed_url(storage_path, filename, inline):
+    """
+    URL signée du storage ; None si l'objet n'existe pas dans le bucket
+    """
+    from supabase_client import supabase
+
+    options = {} if inline else {'download': filename}
+    try:
+        result = supabase.storage.from_(CV_BUCKET_NAME).create_signed_url(storage_path, CV_SIGNED_URL_TTL, options)
+    except Exception as e:
+        print(f"[WARNING] Signed URL unavailable for {storage_path}: {str(e)}")
+        return None
+    return result.get('signedURL') or result.get('signedUrl')
+
+
+def redirect_response(filename, inline):
+    """
+    302 vers une URL signée (mise en cache jusqu'à peu avant son expiration)
+    Returns: None si le fichier n'est pas dans le bucket (repli sur le proxy)
+    """
+    storage_path = f"{CV_STORAGE_FOLDER}/{filename}" if CV_STORAGE_FOLDER else filename
+    signed_url = signed_url_cache().get_or_load(
+        (storage_path, inline),
+        lambda: create_signed_url(storage_path, filename, inline)
+    )
+    if not signed_url:
+        return None
+
+    print(f"[REDIRECT] {filename} -> signed URL")
+    return {
+        'statusCode': 302,
+        'headers': dict(CORS_HEADERS, **{
+            'Location': signed_url,
+            'Cache-Control': 'private, no-store'
+        }),
+        'body': ''
+    }
+
+
+def file_etag(stat):
+    """
+    ETag fort dérivé de la taille et de la date de modification (sans relire le fichier)
+    """
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def not_modified(request_headers, etag, mtime):
+    """
+    If-None-Match (prioritaire) puis If-Modified-Since
+    """
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+    since = _parse_http_date(request_headers.get('if-modified-since'))
+    return since is not None and int(mtime) <= since
+
+
+def range_applies(request_headers, etag, mtime):
+    """
+    If-Range : la plage n'est servie que si le fichier n'a pas changé
+    """
+    if_range = request_headers.get('if-range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = _parse_http_date(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def parse_range(header, size):
+    """
+    Plage unique « bytes=début-fin », « bytes=début- » ou « bytes=-suffixe »
+    Returns: (début, fin) inclusifs, None (en-tête ignoré : fichier entier)
+             ou 'unsatisfiable'
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                return 'unsatisfiable'
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, min(end, size - 1)
+
+
+def read_base64(path, start, length):
+    """
+    Encode en base64 la plage [start, start + length) du fichier, par blocs,
+    depuis une projection mémoire (seules les pages lues sont chargées)
+    """
+    if length <= 0:
+        return ''
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        end = start + length
+        return ''.join(
+            base64.b64encode(view[offset:min(offset + READ_CHUNK_SIZE, end)]).decode('ascii')
+            for offset in range(start, end, READ_CHUNK_SIZE)
+        )
+
+
 def error_response(status_code, message):
     """
     Génère une réponse d'erreur standardisée
@@ -0,0 +1,45 @@
+"""
+Configuration gunicorn pour AE2I (chargée automatiquement par `gunicorn app:app`)
+"""
+
+import os
+import shutil
+import tempfile
+
+# bind, workers, threads et timeout restent ceux de gunicorn (PORT et
+# WEB_CONCURRENCY sont lus de l'environnement) : ce fichier ne règle que
+# l'initialisation des clients après le fork
+
+# Métriques Prometheus partagées entre workers (fichiers mmap) : la variable
+# doit être définie avant que les workers n'importent prometheus_client
+PROMETHEUS_MULTIPROC_DIR = (os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+                            or os.path.join(tempfile.gettempdir(), 'ae2i-prometheus'))
+os.environ['PROMETHEUS_MULTIPROC_DIR'] = PROMETHEUS_MULTIPROC_DIR
+
+# L'application est importée dans chaque worker : aucun client HTTP n'est
+# partagé entre processus à travers le fork
+preload_app = False
+
+
+def post_worker_init(worker):
+    """
+    Ouvre la connexion Supabase du worker avant la première requête
+    """
+    from supabase_client import warm_up
+    warm_up()
+
+
+def on_starting(server):
+    """
+    Repart de compteurs vides à chaque démarrage du master
+    """
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """
+    Nettoie les fichiers du worker terminé (ses compteurs restent agrégés)
+    """
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
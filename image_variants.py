@@ -0,0 +1,165 @@
+"""
+Variantes d'images pour AE2I
+Génère, après l'upload d'une image, des miniatures redimensionnées et des
+versions WebP dans un pool de processus (le décodage/encodage est lié au
+CPU et bloquerait les threads du worker). Nécessite Pillow ; sans Pillow
+le pipeline est simplement désactivé.
+"""
+
+import os
+import io
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS_ENABLED = os.getenv("IMAGE_VARIANTS_ENABLED", "1") == "1"
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+IMAGE_VARIANT_TIMEOUT = float(os.getenv("IMAGE_VARIANT_TIMEOUT", "30"))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_JPEG_QUALITY = 85
+
+# Nom de variante -> plus grand côté en pixels ("thumb:320,medium:1024")
+IMAGE_VARIANT_SIZES = {
+    name: int(size)
+    for name, size in (
+        item.split(':') for item in os.getenv("IMAGE_VARIANT_SIZES", "thumb:320,medium:1024").split(',') if item
+    )
+}
+
+# Formats décodés ; les GIF (souvent animés) sont laissés tels quels
+SUPPORTED_MIME_TYPES = {'image/jpeg', 'image/jpg', 'image/png', 'image/webp'}
+
+SAVE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+_pool = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def supports(mime_type: str) -> bool:
+    return IMAGE_VARIANTS_ENABLED and mime_type in SUPPORTED_MIME_TYPES and pillow_available()
+
+
+def _encode(image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=IMAGE_WEBP_QUALITY, method=4)
+    elif image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def render_variants(source, sizes: Dict[str, int]) -> List[dict]:
+    """
+    Exécuté dans un processus du pool.
+    source : octets de l'image ou chemin d'un fichier local
+    Returns: [{name, data, extension, mime_type, width, height}]
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as original:
+        original_format = original.format if original.format in SAVE_FORMATS else 'PNG'
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        variants = []
+
+        def add(name, rendered, image_format):
+            extension, mime_type = SAVE_FORMATS[image_format]
+            variants.append({
+                "name": name,
+                "data": _encode(rendered, image_format),
+                "extension": extension,
+                "mime_type": mime_type,
+                "width": rendered.width,
+                "height": rendered.height
+            })
+
+        for name, size in sorted(sizes.items(), key=lambda item: item[1]):
+            # Pas d'agrandissement : une image déjà plus petite n'a pas de miniature
+            if max(image.size) <= size:
+                continue
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            if original_format != 'WEBP':
+                add(name, resized, original_format)
+            add(f"{name}_webp", resized, 'WEBP')
+
+        if original_format != 'WEBP':
+            add('webp', image, 'WEBP')
+
+    return variants
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processus du worker courant (recréé après un fork).
+    Démarrage en « spawn » : les enfants ne dupliquent pas les threads et
+    sockets du worker gunicorn.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    """
+    Oublie un pool cassé (processus enfant tué, ex. OOM) : le prochain
+    appel à get_pool() en recrée un
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_variants(source, sizes: Dict[str, int] = None, timeout: float = IMAGE_VARIANT_TIMEOUT) -> List[dict]:
+    """
+    Calcule les variantes dans le pool de processus
+    Returns: liste vide si l'image ne peut pas être traitée
+    """
+    pool = get_pool()
+    try:
+        future = pool.submit(render_variants, source, sizes or IMAGE_VARIANT_SIZES)
+        return future.result(timeout=timeout)
+    except BrokenExecutor as e:
+        discard_pool(pool)
+        logger.warning(f"Pool de variantes cassé, recréé au prochain upload: {str(e)}")
+        return []
+    except Exception as e:
+        logger.warning(f"Génération des variantes impossible: {type(e).__name__}: {str(e)}")
+        return []
+
+
+def variant_path(storage_path: str, name: str, extension: str) -> str:
+    """
+    Chemin dérivé, à côté de l'original : images/abc.jpg -> images/abc__thumb.jpg
+    """
+    stem = os.path.splitext(storage_path)[0]
+    return f"{stem}__{name}.{extension}"
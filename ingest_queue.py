@@ -0,0 +1,289 @@
+"""
+File d'ingestion différée (write-behind) pour AE2I
+Les soumissions publiques sont écrites dans un spool SQLite local puis
+insérées par lots dans Supabase par un thread de fond, avec reprises.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import atexit
+from typing import Callable, Dict, List, Optional
+
+from audit_log import is_rejected
+
+logger = logging.getLogger(__name__)
+
+INGEST_ASYNC = os.getenv("INGEST_ASYNC", "0") in ("1", "true")
+INGEST_SPOOL_PATH = os.getenv("INGEST_SPOOL_PATH", os.path.join("uploads", "ingest_spool.db"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "2"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "10"))
+
+# Une réservation plus ancienne est considérée abandonnée (worker tué)
+CLAIM_TIMEOUT = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL,
+    last_error TEXT,
+    dead INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_spool_ready ON spool(dead, target, next_attempt_at, id);
+"""
+
+
+class IngestQueue:
+    """
+    Spool durable + flusher de fond pour les insertions Supabase
+    """
+
+    def __init__(self, client, path: str = INGEST_SPOOL_PATH,
+                 batch_size: int = INGEST_BATCH_SIZE,
+                 flush_interval: float = INGEST_FLUSH_INTERVAL,
+                 max_attempts: int = INGEST_MAX_ATTEMPTS,
+                 on_flushed: Optional[Callable[[str, int], None]] = None):
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.on_flushed = on_flushed
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.last_flush_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        atexit.register(self.stop)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, target: str, record: dict) -> int:
+        """
+        Écrit une soumission dans le spool (durable dès le retour)
+        """
+        self.ensure_started()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO spool (target, payload, enqueued_at) VALUES (?, ?, ?)",
+                (target, json.dumps(record, default=str), time.time())
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def ensure_started(self):
+        """
+        Démarre le flusher dans le processus courant (après le fork gunicorn)
+        """
+        with self._start_lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ingest-flusher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Arrête le flusher après une dernière vidange
+        """
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.flush_once():
+                    pass
+            except Exception as e:
+                logger.error(f"Erreur du flusher d'ingestion: {str(e)}")
+            self._stop.wait(self.flush_interval)
+        try:
+            while self.flush_once():
+                pass
+        except Exception as e:
+            logger.error(f"Erreur de vidange finale du spool: {str(e)}")
+
+    def _claim(self) -> List[tuple]:
+        """
+        Réserve un lot prêt d'une même table (sûr entre plusieurs workers)
+        """
+        now = time.time()
+        owner = str(os.getpid())
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT target FROM spool WHERE dead = 0 AND next_attempt_at <= ? "
+                "AND (claimed_by IS NULL OR claimed_at < ?) ORDER BY id LIMIT 1",
+                (now, now - CLAIM_TIMEOUT)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return []
+            rows = conn.execute(
+                "SELECT id, target, payload, attempts FROM spool WHERE dead = 0 AND target = ? "
+                "AND next_attempt_at <= ? AND (claimed_by IS NULL OR claimed_at < ?) "
+                "ORDER BY id LIMIT ?",
+                (row[0], now, now - CLAIM_TIMEOUT, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE spool SET claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(owner, now, r[0]) for r in rows]
+            )
+            conn.execute("COMMIT")
+            return rows
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def flush_once(self) -> bool:
+        """
+        Insère un lot dans Supabase
+        Returns: True si un lot a été traité (il peut en rester d'autres)
+        """
+        rows = self._claim()
+        if not rows:
+            return False
+
+        target = rows[0][1]
+        inserted, rejected, retry, error = self._insert_rows(target, rows)
+
+        if inserted:
+            conn = self._connect()
+            try:
+                conn.executemany("DELETE FROM spool WHERE id = ?", [(r[0],) for r in inserted])
+            finally:
+                conn.close()
+            self.last_flush_at = time.time()
+            logger.info(f"Ingestion différée: {len(inserted)} ligne(s) insérée(s) dans {target}")
+            if self.on_flushed:
+                self.on_flushed(target, len(inserted))
+
+        if rejected:
+            self._reject(rejected)
+
+        if retry:
+            self.last_error = error
+            logger.warning(f"Échec d'insertion différée dans {target} ({len(retry)} lignes): {error}")
+            self._release_failed(retry, error)
+            return False
+        return True
+
+    def _insert_rows(self, target: str, rows: List[tuple]):
+        """
+        Insère des lignes réservées. Un lot refusé par la base est coupé en
+        deux jusqu'à isoler les lignes invalides : une soumission invalide
+        n'entraîne pas les autres dans ses reprises.
+        Returns: (insérées, [(ligne, erreur)] refusées, à réessayer, erreur transitoire)
+        """
+        try:
+            self.client.table(target).insert([json.loads(r[2]) for r in rows]).execute()
+            return rows, [], [], None
+        except Exception as e:
+            if not is_rejected(e):
+                return [], [], rows, str(e)
+            if len(rows) == 1:
+                return [], [(rows[0], str(e))], [], None
+
+        middle = len(rows) // 2
+        inserted, rejected, retry, error = self._insert_rows(target, rows[:middle])
+        if retry:
+            # Base injoignable : inutile d'essayer l'autre moitié maintenant
+            return inserted, rejected, retry + rows[middle:], error
+        more_inserted, more_rejected, retry, error = self._insert_rows(target, rows[middle:])
+        return inserted + more_inserted, rejected + more_rejected, retry, error
+
+    def _reject(self, rejected: List[tuple]):
+        """
+        Met de côté (dead letter) les lignes refusées par la base : une reprise
+        donnerait le même refus
+        """
+        for (row_id, target, _, _), error in rejected:
+            logger.error(f"Soumission {row_id} refusée par {target}, mise de côté: {error}")
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE spool SET attempts = attempts + 1, last_error = ?, dead = 1, "
+                "claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+                [(error, row[0]) for row, error in rejected]
+            )
+        finally:
+            conn.close()
+
+    def _release_failed(self, rows: List[tuple], error: str):
+        """
+        Replanifie un lot en échec avec un backoff exponentiel
+        """
+        now = time.time()
+        updates = []
+        for row_id, _, _, attempts in rows:
+            attempts += 1
+            delay = min(2 ** attempts, 600)
+            dead = 1 if attempts >= self.max_attempts else 0
+            updates.append((attempts, now + delay, error, dead, row_id))
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE spool SET attempts = ?, next_attempt_at = ?, last_error = ?, dead = ?, "
+                "claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+                updates
+            )
+        finally:
+            conn.close()
+
+    def status(self) -> Dict:
+        """
+        Profondeur de file, retard et état du flusher
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            depth = {
+                target: count for target, count in conn.execute(
+                    "SELECT target, COUNT(*) FROM spool WHERE dead = 0 GROUP BY target"
+                )
+            }
+            oldest = conn.execute("SELECT MIN(enqueued_at) FROM spool WHERE dead = 0").fetchone()[0]
+            dead = conn.execute("SELECT COUNT(*) FROM spool WHERE dead = 1").fetchone()[0]
+        finally:
+            conn.close()
+
+        return {
+            'enabled': True,
+            'depth': sum(depth.values()),
+            'depth_by_table': depth,
+            'lag_seconds': round(now - oldest, 3) if oldest else 0,
+            'dead_letters': dead,
+            'flusher_running': bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+            'last_flush_at': self.last_flush_at,
+            'last_error': self.last_error
+        }
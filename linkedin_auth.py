@@ -2,15 +2,57 @@
 Netlify Function: LinkedIn OAuth Authentication
 FIX: linkedin-token-exchange
 ADD: linkedin-user-profile-fetch
+ADD: pooled-http-client
+ADD: linkedin-token-cache
 
-Échange le code OAuth contre un token et récupère les données du profil utilisateur
+Échange le code OAuth contre un token et récupère les données du profil utilisateur.
+Les appels à LinkedIn passent par un client HTTP keep-alive conservé entre
+les invocations d'un conteneur chaud, avec timeouts stricts, retry avec
+jitter sur 429/5xx et journalisation de la latence de chaque appel.
+
+Les tokens sont enregistrés dans linkedin_tokens avec le profil normalisé,
+mis en cache par `sub` : un utilisateur de retour (body {"access_token"})
+est servi depuis ce cache, l'access token expiré étant renouvelé avec le
+refresh token ; /v2/userinfo n'est rappelé qu'à l'expiration du profil.
 """
 
 import json
 import os
-import urllib.request
-import urllib.parse
-import urllib.error
+import time
+import random
+
+import httpx
+
+import linkedin_tokens
+from metrics import LINKEDIN_TOKEN_STORE_ERRORS
+
+# Endpoints LinkedIn (surchargeables, ex. stub local)
+LINKEDIN_TOKEN_URL = os.getenv('LINKEDIN_TOKEN_URL', 'https://www.linkedin.com/oauth/v2/accessToken')
+LINKEDIN_USERINFO_URL = os.getenv('LINKEDIN_USERINFO_URL', 'https://api.linkedin.com/v2/userinfo')
+
+LINKEDIN_CONNECT_TIMEOUT = float(os.getenv('LINKEDIN_CONNECT_TIMEOUT', '3'))
+LINKEDIN_READ_TIMEOUT = float(os.getenv('LINKEDIN_READ_TIMEOUT', '5'))
+LINKEDIN_MAX_RETRIES = int(os.getenv('LINKEDIN_MAX_RETRIES', '2'))
+LINKEDIN_RETRY_BACKOFF = float(os.getenv('LINKEDIN_RETRY_BACKOFF', '0.25'))
+# Budget total d'un appel, retries compris (reste sous la limite de la fonction)
+LINKEDIN_CALL_DEADLINE = float(os.getenv('LINKEDIN_CALL_DEADLINE', '8'))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_http_client = None
+
+
+class UpstreamError(Exception):
+    """LinkedIn injoignable ou trop lent après les retries"""
+
+
+class AuthError(Exception):
+    """Échec d'authentification à renvoyer tel quel au client"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
 
 
 def handler(event, context):
@@ -38,8 +80,9 @@ def handler(event, context):
         # Parser le body
         body = json.loads(event.get('body', '{}'))
         code = body.get('code')
+        returning_token = body.get('access_token')
 
-        if not code:
+        if not code and not returning_token:
             return error_response(400, 'Missing authorization code')
 
         # Récupérer les variables d'environnement
@@ -50,68 +93,19 @@ def handler(event, context):
             print('[ERROR] LinkedIn credentials not configured')
             return error_response(500, 'LinkedIn not configured. Please contact administrator.')
 
-        # Construire le redirect_uri
-        host = event.get('headers', {}).get('host', '')
-        protocol = 'https://' if 'netlify.app' in host or 'ae2i' in host else 'http://'
-        redirect_uri = f"{protocol}{host}"
-
-        # Échanger le code contre un access token
-        token_url = 'https://www.linkedin.com/oauth/v2/accessToken'
-        token_data = {
-            'grant_type': 'authorization_code',
-            'code': code,
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'redirect_uri': redirect_uri
-        }
-
-        token_data_encoded = urllib.parse.urlencode(token_data).encode('utf-8')
-        token_request = urllib.request.Request(
-            token_url,
-            data=token_data_encoded,
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-        )
-
-        try:
-            with urllib.request.urlopen(token_request) as response:
-                token_response = json.loads(response.read().decode('utf-8'))
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode('utf-8')
-            print(f'[ERROR] LinkedIn token exchange failed: {error_body}')
-            return error_response(401, 'Failed to authenticate with LinkedIn')
-
-        access_token = token_response.get('access_token')
-        if not access_token:
-            return error_response(401, 'No access token received')
-
-        # Récupérer les informations du profil utilisateur
-        profile_url = 'https://api.linkedin.com/v2/userinfo'
-        profile_request = urllib.request.Request(
-            profile_url,
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-
         try:
-            with urllib.request.urlopen(profile_request) as response:
-                profile_data = json.loads(response.read().decode('utf-8'))
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode('utf-8')
-            print(f'[ERROR] LinkedIn profile fetch failed: {error_body}')
-            return error_response(401, 'Failed to fetch LinkedIn profile')
-
-        # Extraire les données pertinentes
-        user_data = {
-            'access_token': access_token,
-            'sub': profile_data.get('sub', ''),
-            'firstName': profile_data.get('given_name', ''),
-            'lastName': profile_data.get('family_name', ''),
-            'email': profile_data.get('email', ''),
-            'profilePicture': profile_data.get('picture', ''),
-            'headline': profile_data.get('headline', ''),
-            'publicProfileUrl': f"https://www.linkedin.com/in/{profile_data.get('sub', '')}"
-        }
+            if code:
+                # Construire le redirect_uri
+                host = event.get('headers', {}).get('host', '')
+                protocol = 'https://' if 'netlify.app' in host or 'ae2i' in host else 'http://'
+                redirect_uri = f"{protocol}{host}"
+                user_data, source = sign_in_with_code(code, client_id, client_secret, redirect_uri)
+            else:
+                user_data, source = resume_session(returning_token, client_id, client_secret)
+        except AuthError as e:
+            return error_response(e.status_code, e.message)
 
-        print(f"[SUCCESS] LinkedIn authentication successful for {user_data['firstName']} {user_data['lastName']}")
+        print(f"[SUCCESS] LinkedIn authentication successful for {user_data['firstName']} {user_data['lastName']} ({source})")
 
         # Retourner les données du profil
         return {
@@ -135,6 +129,222 @@ def handler(event, context):
         return error_response(500, f'Internal server error: {str(e)}')
 
 
+def sign_in_with_code(code, client_id, client_secret, redirect_uri):
+    """
+    Premier login : échange du code, puis profil depuis le cache (par sub)
+    ou depuis /v2/userinfo
+    Returns: (user_data, source du profil)
+    """
+    # Le code OAuth est à usage unique : pas de retry après un timeout de lecture
+    tokens = request_token({
+        'grant_type': 'authorization_code',
+        'code': code,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'redirect_uri': redirect_uri
+    }, 'token exchange')
+
+    record = load_token_record(linkedin_tokens.find_by_sub, linkedin_tokens.id_token_sub(tokens.get('id_token')))
+    if linkedin_tokens.profile_is_fresh(record):
+        store_tokens(record['linkedin_sub'], tokens, previous=record)
+        return dict(record['profile'], access_token=tokens['access_token']), 'cache'
+
+    profile = fetch_profile(tokens['access_token'])
+    store_tokens(profile['sub'], tokens, profile, previous=record)
+    return dict(profile, access_token=tokens['access_token']), 'linkedin'
+
+
+def resume_session(access_token, client_id, client_secret):
+    """
+    Utilisateur de retour (access token déjà délivré) : profil servi depuis
+    le cache ; l'access token expiré est renouvelé avec le refresh token
+    Returns: (user_data, source du profil)
+    """
+    record = load_token_record(linkedin_tokens.find_by_access_token, access_token)
+    if not record:
+        raise AuthError(401, 'Unknown LinkedIn session. Please sign in again.')
+
+    tokens = {'access_token': record['access_token']}
+    if linkedin_tokens.is_expired(record):
+        if not record.get('refresh_token'):
+            raise AuthError(401, 'LinkedIn session expired. Please sign in again.')
+        tokens = request_token({
+            'grant_type': 'refresh_token',
+            'refresh_token': record['refresh_token'],
+            'client_id': client_id,
+            'client_secret': client_secret
+        }, 'token refresh', idempotent=True)
+
+    if linkedin_tokens.profile_is_fresh(record):
+        if tokens['access_token'] != record['access_token']:
+            store_tokens(record['linkedin_sub'], tokens, previous=record)
+        return dict(record['profile'], access_token=tokens['access_token']), 'cache'
+
+    profile = fetch_profile(tokens['access_token'])
+    store_tokens(profile['sub'], tokens, profile, previous=record)
+    return dict(profile, access_token=tokens['access_token']), 'linkedin'
+
+
+def request_token(data, name, idempotent=False):
+    """
+    Appel à l'endpoint token (code d'autorisation ou refresh token)
+    Returns: réponse JSON contenant au moins access_token
+    """
+    try:
+        response = linkedin_request('POST', LINKEDIN_TOKEN_URL, 'token', idempotent=idempotent, data=data)
+    except UpstreamError as e:
+        print(f'[ERROR] LinkedIn {name} unavailable: {str(e)}')
+        raise AuthError(504, 'LinkedIn is not responding. Please try again.')
+
+    if not response.is_success:
+        print(f'[ERROR] LinkedIn {name} failed: {response.text}')
+        raise AuthError(401, 'Failed to authenticate with LinkedIn')
+
+    tokens = response.json()
+    if not tokens.get('access_token'):
+        raise AuthError(401, 'No access token received')
+    return tokens
+
+
+def fetch_profile(access_token):
+    """
+    Profil /v2/userinfo, normalisé (sans l'access token)
+    """
+    try:
+        response = linkedin_request(
+            'GET', LINKEDIN_USERINFO_URL, 'userinfo',
+            headers={'Authorization': f'Bearer {access_token}'}
+        )
+    except UpstreamError as e:
+        print(f'[ERROR] LinkedIn profile fetch unavailable: {str(e)}')
+        raise AuthError(504, 'LinkedIn is not responding. Please try again.')
+
+    if not response.is_success:
+        print(f'[ERROR] LinkedIn profile fetch failed: {response.text}')
+        raise AuthError(401, 'Failed to fetch LinkedIn profile')
+
+    profile_data = response.json()
+
+    # Extraire les données pertinentes
+    return {
+        'sub': profile_data.get('sub', ''),
+        'firstName': profile_data.get('given_name', ''),
+        'lastName': profile_data.get('family_name', ''),
+        'email': profile_data.get('email', ''),
+        'profilePicture': profile_data.get('picture', ''),
+        'headline': profile_data.get('headline', ''),
+        'publicProfileUrl': f"https://www.linkedin.com/in/{profile_data.get('sub', '')}"
+    }
+
+
+def load_token_record(finder, key):
+    """
+    Lecture best-effort de linkedin_tokens : une base indisponible ne bloque pas le login
+    """
+    if not key:
+        return None
+    try:
+        return finder(key)
+    except Exception as e:
+        LINKEDIN_TOKEN_STORE_ERRORS.labels('lookup').inc()
+        print(f'[ERROR] LinkedIn token lookup failed: {type(e).__name__}: {str(e)}')
+        return None
+
+
+def store_tokens(sub, tokens, profile=None, previous=None):
+    """
+    Enregistrement best-effort dans linkedin_tokens
+    """
+    if not sub:
+        return
+    try:
+        linkedin_tokens.save(sub, tokens, profile, previous)
+    except Exception as e:
+        LINKEDIN_TOKEN_STORE_ERRORS.labels('store').inc()
+        print(f'[ERROR] LinkedIn token storage failed: {type(e).__name__}: {str(e)}')
+
+
+def http_client():
+    """
+    Client keep-alive du conteneur, réutilisé entre les invocations
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=httpx.Timeout(
+                connect=LINKEDIN_CONNECT_TIMEOUT,
+                read=LINKEDIN_READ_TIMEOUT,
+                write=LINKEDIN_READ_TIMEOUT,
+                pool=LINKEDIN_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60)
+        )
+    return _http_client
+
+
+def attempt_timeout(remaining):
+    """
+    Timeouts d'une tentative, bornés par le budget restant de l'appel
+    """
+    return httpx.Timeout(
+        connect=min(LINKEDIN_CONNECT_TIMEOUT, remaining),
+        read=min(LINKEDIN_READ_TIMEOUT, remaining),
+        write=min(LINKEDIN_READ_TIMEOUT, remaining),
+        pool=min(LINKEDIN_CONNECT_TIMEOUT, remaining)
+    )
+
+
+def retry_delay(attempt, response=None):
+    """
+    Backoff exponentiel avec jitter complet ; Retry-After (en secondes) respecté sur 429/503
+    """
+    delay = random.uniform(0, LINKEDIN_RETRY_BACKOFF * (2 ** attempt))
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+def linkedin_request(method, url, name, idempotent=True, **kwargs):
+    """
+    Appel à LinkedIn avec retry sur 429/5xx et erreurs de connexion.
+    Les timeouts de lecture ne sont réessayés que pour les requêtes idempotentes ;
+    chaque tentative est bornée par ce qui reste de LINKEDIN_CALL_DEADLINE.
+    Returns: la dernière réponse reçue (éventuellement en erreur)
+    Raises: UpstreamError si aucune réponse n'a pu être obtenue
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        call_started = time.monotonic()
+        remaining = LINKEDIN_CALL_DEADLINE - (call_started - started)
+        response = None
+        try:
+            response = http_client().request(method, url, timeout=attempt_timeout(remaining), **kwargs)
+            outcome = response.status_code
+            retryable = response.status_code in RETRY_STATUSES
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            outcome, error = type(e).__name__, e
+            retryable = True
+        except httpx.TransportError as e:
+            outcome, error = type(e).__name__, e
+            retryable = idempotent
+        print(f"[UPSTREAM] linkedin {name} {outcome} "
+              f"{(time.monotonic() - call_started) * 1000:.0f}ms (attempt {attempt + 1})")
+
+        if not retryable or attempt >= LINKEDIN_MAX_RETRIES:
+            break
+        delay = retry_delay(attempt, response)
+        if time.monotonic() - started + delay >= LINKEDIN_CALL_DEADLINE:
+            break
+        time.sleep(delay)
+        attempt += 1
+
+    if response is None:
+        raise UpstreamError(f'{name}: {type(error).__name__}: {str(error)}')
+    return response
+
+
 def error_response(status_code, message):
     """
     Génère une réponse d'erreur standardisée
@@ -0,0 +1,118 @@
+"""
+Persistance des tokens LinkedIn pour AE2I
+Enregistre access_token / refresh_token / expires_at dans la table
+linkedin_tokens, avec le profil normalisé (user_data) mis en cache par
+`sub` pendant LINKEDIN_PROFILE_TTL secondes.
+La table est accédée avec la clé service_role : ses policies RLS
+(TO authenticated, auth.uid() = user_id) ne laissent rien passer avec la
+clé anon, et un login LinkedIn n'a pas de session Supabase.
+"""
+
+import os
+import json
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+LINKEDIN_PROFILE_TTL = int(os.getenv('LINKEDIN_PROFILE_TTL', '86400'))
+# Un access token est considéré expiré un peu avant son échéance réelle
+LINKEDIN_TOKEN_EXPIRY_MARGIN = 60
+
+TABLE = 'linkedin_tokens'
+
+
+class TokenStoreUnavailable(Exception):
+    """Clé service_role absente : linkedin_tokens est inaccessible"""
+
+
+def _client():
+    from data_backend import DATA_BACKEND
+    from supabase_client import SUPABASE_SERVICE_ROLE_KEY, supabase_admin
+    if not SUPABASE_SERVICE_ROLE_KEY and DATA_BACKEND != 'local':
+        raise TokenStoreUnavailable('SUPABASE_SERVICE_ROLE_KEY non configurée')
+    return supabase_admin
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def id_token_sub(id_token: Optional[str]) -> Optional[str]:
+    """
+    `sub` de l'id_token OpenID renvoyé avec l'access token.
+    Reçu directement de l'endpoint token en TLS : la signature n'a pas à
+    être vérifiée (OpenID Connect Core, 3.1.3.7).
+    """
+    if not id_token or id_token.count('.') != 2:
+        return None
+    payload = id_token.split('.')[1]
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (ValueError, TypeError):
+        return None
+    return claims.get('sub') if isinstance(claims, dict) else None
+
+
+def find_by_sub(sub: str) -> Optional[dict]:
+    result = _client().table(TABLE).select('*').eq('linkedin_sub', sub).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def find_by_access_token(access_token: str) -> Optional[dict]:
+    result = _client().table(TABLE).select('*').eq('access_token', access_token).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def is_expired(record: dict) -> bool:
+    """
+    Access token expiré (sans échéance connue : considéré valide)
+    """
+    expires_at = _parse_timestamp(record.get('expires_at'))
+    if expires_at is None:
+        return False
+    margin = timedelta(seconds=LINKEDIN_TOKEN_EXPIRY_MARGIN)
+    return datetime.now(timezone.utc) + margin >= expires_at
+
+
+def profile_is_fresh(record: Optional[dict]) -> bool:
+    """
+    Profil en cache encore dans son TTL
+    """
+    if not record or not record.get('profile'):
+        return False
+    fetched_at = _parse_timestamp(record.get('profile_fetched_at'))
+    if fetched_at is None:
+        return False
+    return datetime.now(timezone.utc) - fetched_at < timedelta(seconds=LINKEDIN_PROFILE_TTL)
+
+
+def save(sub: str, tokens: dict, profile: Optional[dict] = None, previous: Optional[dict] = None) -> dict:
+    """
+    Enregistre (upsert par sub) les tokens et, s'il est fourni, le profil.
+    Refresh token ou échéance absents de `tokens` (LinkedIn ne renvoie pas
+    toujours de nouveau refresh_token) : les valeurs de `previous` sont conservées.
+    """
+    now = datetime.now(timezone.utc)
+    previous = previous or {}
+    expires_at = previous.get('expires_at')
+    if tokens.get('expires_in'):
+        expires_at = (now + timedelta(seconds=int(tokens['expires_in']))).isoformat()
+    record = {
+        'linkedin_sub': sub,
+        'access_token': tokens['access_token'],
+        'refresh_token': tokens.get('refresh_token') or previous.get('refresh_token'),
+        'expires_at': expires_at,
+        'updated_at': now.isoformat()
+    }
+    if profile is not None:
+        record['profile'] = profile
+        record['profile_fetched_at'] = now.isoformat()
+
+    result = _client().table(TABLE).upsert(record, on_conflict='linkedin_sub').execute()
+    return result.data[0] if result.data else record
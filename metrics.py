@@ -0,0 +1,244 @@
+"""
+Métriques de latence pour AE2I
+- Histogrammes Prometheus par route HTTP et par appel Supabase (table/storage)
+- En-tête Server-Timing séparant temps base de données et sérialisation JSON
+- Endpoint /metrics au format texte Prometheus
+
+Avec plusieurs workers gunicorn, PROMETHEUS_MULTIPROC_DIR (fixé par
+gunicorn.conf.py avant l'import de l'application) fait écrire chaque worker
+dans des fichiers partagés : /metrics agrège alors tous les workers au lieu
+de ne renvoyer que ceux du worker qui a répondu.
+"""
+
+import os
+import time
+from flask import Flask, Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Méthodes du query builder qui déterminent l'opération d'une requête
+TABLE_ACTIONS = {'select', 'insert', 'update', 'upsert', 'delete'}
+
+
+HTTP_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Durée de traitement des requêtes HTTP par route',
+    ('method', 'route', 'status'),
+    buckets=DEFAULT_BUCKETS
+)
+SUPABASE_DURATION = Histogram(
+    'supabase_call_duration_seconds',
+    'Durée des appels Supabase (tables et storage)',
+    ('kind', 'target', 'operation', 'outcome'),
+    buckets=DEFAULT_BUCKETS
+)
+SERIALIZE_DURATION = Histogram(
+    'json_serialize_duration_seconds',
+    'Durée de sérialisation JSON des réponses par route',
+    ('route',),
+    buckets=DEFAULT_BUCKETS
+)
+LOG_ROWS_REJECTED = Counter(
+    'log_rows_rejected',
+    'Lignes de journal (ex. media_uploads) refusées par la base et abandonnées',
+    ('table',)
+)
+LINKEDIN_TOKEN_STORE_ERRORS = Counter(
+    'linkedin_token_store_errors',
+    'Lectures/écritures de linkedin_tokens en échec (login poursuivi sans cache)',
+    ('operation',)
+)
+
+
+def _add_request_timing(key: str, elapsed: float):
+    if has_request_context():
+        setattr(g, key, getattr(g, key, 0.0) + elapsed)
+
+
+def observe_supabase_call(kind: str, target: str, operation: str, outcome: str, elapsed: float):
+    """
+    Enregistre un appel Supabase (histogramme + cumul pour Server-Timing)
+    """
+    SUPABASE_DURATION.labels(kind, target, operation, outcome).observe(elapsed)
+    _add_request_timing('db_time', elapsed)
+
+
+def _timed(kind: str, target: str, operation: str, func, *args, **kwargs):
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        observe_supabase_call(kind, target, operation, outcome, time.perf_counter() - started)
+
+
+# ========== PROXYS DU CLIENT ==========
+
+class InstrumentedQuery:
+    """
+    Enveloppe un query builder : chronomètre execute() avec table et opération
+    """
+
+    def __init__(self, builder, table: str, operation: str = 'select'):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def execute(self):
+        return _timed('table', self._table, self._operation, self._builder.execute)
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            operation = name if name in TABLE_ACTIONS else self._operation
+            return InstrumentedQuery(result, self._table, operation)
+        return chained
+
+
+class InstrumentedBucket:
+    """
+    Enveloppe un bucket storage : chronomètre chaque appel
+    """
+
+    def __init__(self, bucket, bucket_id: str):
+        self._bucket = bucket
+        self._bucket_id = bucket_id
+
+    def __getattr__(self, name):
+        attr = getattr(self._bucket, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            return _timed('storage', self._bucket_id, name, attr, *args, **kwargs)
+        return timed
+
+
+class InstrumentedStorage:
+    """
+    Enveloppe le client storage (list_buckets, create_bucket, from_)
+    """
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def from_(self, bucket_id: str) -> InstrumentedBucket:
+        return InstrumentedBucket(self._storage.from_(bucket_id), bucket_id)
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            return _timed('storage', '*', name, attr, *args, **kwargs)
+        return timed
+
+
+class InstrumentedClient:
+    """
+    Enveloppe un client Supabase (ou le backend local) pour mesurer ses appels
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.storage = InstrumentedStorage(client.storage)
+
+    def table(self, table_name: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.table(table_name), table_name)
+
+    def from_(self, table_name: str) -> InstrumentedQuery:
+        return self.table(table_name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_client(client):
+    """
+    Retourne le client instrumenté (None reste None)
+    """
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+# ========== INTÉGRATION FLASK ==========
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON qui cumule le temps de sérialisation de la requête
+    """
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            _add_request_timing('serialize_time', time.perf_counter() - started)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.db_time = 0.0
+    g.serialize_time = 0.0
+
+
+def _record_request(response):
+    started = getattr(g, 'request_started', None)
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if route == '/metrics':
+        return response
+
+    db_time = getattr(g, 'db_time', 0.0)
+    serialize_time = getattr(g, 'serialize_time', 0.0)
+    HTTP_DURATION.labels(request.method, route, response.status_code).observe(total)
+    SERIALIZE_DURATION.labels(route).observe(serialize_time)
+
+    response.headers['Server-Timing'] = (
+        f'db;dur={db_time * 1000:.1f}, '
+        f'serialize;dur={serialize_time * 1000:.1f}, '
+        f'app;dur={max(total - db_time - serialize_time, 0) * 1000:.1f}, '
+        f'total;dur={total * 1000:.1f}'
+    )
+    return response
+
+
+def metrics_endpoint():
+    """
+    Expose les métriques au format texte Prometheus (tous les workers en
+    mode multiprocessus)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app: Flask):
+    """
+    Installe les hooks de mesure et la route /metrics (idempotent)
+    """
+    if 'ae2i_metrics' in app.extensions:
+        return
+    app.extensions['ae2i_metrics'] = True
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
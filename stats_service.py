@@ -0,0 +1,87 @@
+"""
+Service de statistiques pour AE2I
+Comptages côté serveur (head-only) exécutés en parallèle, avec cache TTL
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "60"))
+
+# Clé de statistique -> table comptée
+STATS_TABLES = {
+    'total_candidatures': 'candidatures',
+    'total_jobs': 'jobs',
+    'total_contacts': 'contacts',
+}
+
+
+class StatsService:
+    """
+    Calcule et met en cache les compteurs du tableau de bord
+    """
+
+    def __init__(self, client, ttl: int = STATS_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._snapshot: Optional[Dict[str, int]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(STATS_TABLES),
+            thread_name_prefix='stats'
+        )
+
+    def count(self, table: str) -> int:
+        """
+        Compte les lignes d'une table sans télécharger de données
+        (HEAD + Prefer: count=exact)
+        """
+        result = self.client.table(table).select('id', count='exact', head=True).execute()
+        return result.count or 0
+
+    def compute(self) -> Dict[str, int]:
+        """
+        Lance les comptages en parallèle et assemble le snapshot
+        """
+        futures = {
+            key: self._executor.submit(self.count, table)
+            for key, table in STATS_TABLES.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+    def get_snapshot(self) -> Dict[str, int]:
+        """
+        Retourne le snapshot en cache, ou le recalcule s'il a expiré
+        """
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() < self._expires_at:
+                return dict(self._snapshot)
+            generation = self._generation
+
+        snapshot = self.compute()
+
+        with self._lock:
+            # Une invalidation pendant le calcul rend ce résultat obsolète
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.ttl
+
+        return dict(snapshot)
+
+    def invalidate(self):
+        """
+        Vide le cache (appelé après une création ou une suppression)
+        """
+        with self._lock:
+            self._snapshot = None
+            self._expires_at = 0.0
+            self._generation += 1
+        logger.debug("Cache des statistiques invalidé")
@@ -0,0 +1,162 @@
+"""
+Listing paginé du storage pour AE2I
+Parcourt un bucket par pages (limit/offset de l'API storage), éventuellement
+récursivement avec les sous-dossiers listés en parallèle, et construit les
+URL publiques localement à partir de la base en cache.
+"""
+
+import os
+import json
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Taille de page demandée à l'API storage (son maximum)
+STORAGE_LIST_PAGE_SIZE = 1000
+LIST_FILES_DEFAULT_LIMIT = 100
+LIST_FILES_MAX_LIMIT = 1000
+LIST_FILES_PARALLELISM = int(os.getenv("LIST_FILES_PARALLELISM", "4"))
+# Arborescence complète gardée brièvement pour paginer un listing récursif
+LIST_FILES_CACHE_TTL = int(os.getenv("LIST_FILES_CACHE_TTL", "30"))
+
+SORT_BY_NAME = {"column": "name", "order": "asc"}
+
+
+def encode_list_cursor(position) -> str:
+    """Encode une position de listing (offset ou dernier chemin)"""
+    payload = json.dumps(position)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_list_cursor(cursor: str) -> dict:
+    """
+    Décode un curseur opaque de listing : {"offset": entier >= 0} ou
+    {"after": chemin} ; toute autre forme lève ValueError (400)
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception:
+        raise ValueError('Curseur invalide')
+    if not isinstance(position, dict):
+        raise ValueError('Curseur invalide')
+    offset = position.get('offset', 0)
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise ValueError('Curseur invalide')
+    if not isinstance(position.get('after', ''), str):
+        raise ValueError('Curseur invalide')
+    return position
+
+
+def is_folder(entry: dict) -> bool:
+    """Les préfixes (dossiers) sont renvoyés sans id ni métadonnées"""
+    return entry.get('id') is None
+
+
+class StorageLister:
+    """
+    Moteur de listing d'un bucket : pages, parcours récursif parallèle
+    """
+
+    def __init__(self, client, bucket_name: str, public_url: Callable[[str], str],
+                 page_size: int = STORAGE_LIST_PAGE_SIZE,
+                 parallelism: int = LIST_FILES_PARALLELISM,
+                 cache_ttl: int = LIST_FILES_CACHE_TTL):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.public_url = public_url
+        self.page_size = page_size
+        self.parallelism = max(1, parallelism)
+        self.cache = TTLCache(cache_ttl, max_entries=64)
+
+    def _list(self, folder: str, limit: int, offset: int) -> List[dict]:
+        return self.client.storage.from_(self.bucket_name).list(
+            folder, {"limit": limit, "offset": offset, "sortBy": SORT_BY_NAME}
+        )
+
+    def iter_entries(self, folder: str):
+        """
+        Toutes les entrées directes d'un dossier, page par page
+        """
+        offset = 0
+        while True:
+            entries = self._list(folder, self.page_size, offset)
+            yield from entries
+            if len(entries) < self.page_size:
+                return
+            offset += len(entries)
+
+    def describe(self, folder: str, entry: dict) -> dict:
+        storage_path = f"{folder}/{entry['name']}" if folder else entry['name']
+        if is_folder(entry):
+            return {"name": entry['name'], "storage_path": storage_path, "is_folder": True}
+        return {
+            "name": entry['name'],
+            "storage_path": storage_path,
+            "public_url": self.public_url(storage_path),
+            "size": (entry.get('metadata') or {}).get('size'),
+            "created_at": entry.get('created_at'),
+            "updated_at": entry.get('updated_at')
+        }
+
+    def list_page(self, folder: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Une page d'un dossier (fichiers et sous-dossiers), triée par nom
+        Returns: (éléments, curseur suivant ou None)
+        """
+        offset = int(decode_list_cursor(cursor).get('offset', 0)) if cursor else 0
+        entries = self._list(folder, limit + 1, offset)
+        has_more = len(entries) > limit
+        items = [self.describe(folder, e) for e in entries[:limit] if e.get('name')]
+        next_cursor = encode_list_cursor({"offset": offset + limit}) if has_more else None
+        return items, next_cursor
+
+    def walk(self, folder: str) -> List[dict]:
+        """
+        Tous les fichiers sous folder ; chaque niveau de sous-dossiers est
+        listé en parallèle
+        """
+        files = []
+        prefixes = [folder]
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix='storage-list') as pool:
+            while prefixes:
+                next_prefixes = []
+                for prefix, entries in zip(prefixes, pool.map(lambda p: list(self.iter_entries(p)), prefixes)):
+                    for entry in entries:
+                        if not entry.get('name'):
+                            continue
+                        item = self.describe(prefix, entry)
+                        if item.get('is_folder'):
+                            next_prefixes.append(item['storage_path'])
+                        else:
+                            files.append(item)
+                prefixes = next_prefixes
+        files.sort(key=lambda f: f['storage_path'])
+        return files
+
+    def walk_page(self, folder: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Une page du listing récursif, paginée par chemin (keyset)
+        Returns: (fichiers, curseur suivant ou None)
+        """
+        after = decode_list_cursor(cursor).get('after') if cursor else None
+        files = self.cache.get_or_load(folder, lambda: self.walk(folder))
+
+        start = 0
+        if after is not None:
+            start = next((i for i, f in enumerate(files) if f['storage_path'] > after), len(files))
+        page = files[start:start + limit]
+        has_more = start + limit < len(files)
+        next_cursor = encode_list_cursor({"after": page[-1]['storage_path']}) if has_more and page else None
+        return page, next_cursor
+
+    def invalidate(self):
+        """
+        À appeler après un upload ou une suppression
+        """
+        self.cache.clear()
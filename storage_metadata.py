@@ -0,0 +1,134 @@
+"""
+Cache des métadonnées du storage pour AE2I
+Existence du bucket, disponibilité de la table media_uploads et base des
+URL publiques, rafraîchies en arrière-plan au lieu d'être interrogées à
+chaque upload ou health check.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+STORAGE_METADATA_TTL = float(os.getenv("STORAGE_METADATA_TTL", "300"))
+
+PROBE_PATH = "__probe__"
+
+
+class StorageMetadataCache:
+    """
+    État du bucket et de la table de journalisation, avec TTL
+    """
+
+    def __init__(self, client, bucket_name: str, table_name: str = 'media_uploads',
+                 ttl: float = STORAGE_METADATA_TTL):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.table_name = table_name
+        self.ttl = ttl
+        self.supabase_connected = False
+        self.bucket_exists = False
+        self.table_exists = False
+        self.public_url_base: Optional[str] = None
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def is_fresh(self) -> bool:
+        return self.refreshed_at and time.monotonic() - self.refreshed_at < self.ttl
+
+    def refresh(self, create_bucket: bool = True):
+        """
+        Interroge le storage : buckets, sonde de table, base des URL publiques
+        """
+        with self._lock:
+            try:
+                buckets = self.client.storage.list_buckets()
+                self.supabase_connected = True
+                self.bucket_exists = any(b.name == self.bucket_name for b in buckets)
+
+                if not self.bucket_exists and create_bucket:
+                    logger.info(f"Création du bucket {self.bucket_name}")
+                    self.client.storage.create_bucket(self.bucket_name, options={"public": True})
+                    self.bucket_exists = True
+                    logger.info(f"Bucket {self.bucket_name} créé avec succès")
+
+                if self.public_url_base is None:
+                    probe_url = self.client.storage.from_(self.bucket_name).get_public_url(PROBE_PATH)
+                    self.public_url_base = probe_url.split(PROBE_PATH)[0]
+            except Exception as e:
+                self.supabase_connected = False
+                self.bucket_exists = False
+                logger.error(f"Erreur lors de la vérification/création du bucket: {str(e)}")
+
+            try:
+                self.client.table(self.table_name).select('id').limit(1).execute()
+                self.table_exists = True
+            except Exception:
+                self.table_exists = False
+
+            self.refreshed_at = time.monotonic()
+
+    def ensure_bucket(self) -> bool:
+        """
+        True si le bucket existe (cache), sinon vérifie et le crée
+        """
+        if self.bucket_exists and self.is_fresh():
+            return True
+        self.refresh()
+        return self.bucket_exists
+
+    def public_url(self, storage_path: str) -> str:
+        """
+        URL publique construite localement à partir de la base en cache
+        """
+        if self.public_url_base is None:
+            self.refresh(create_bucket=False)
+        if self.public_url_base is None:
+            return self.client.storage.from_(self.bucket_name).get_public_url(storage_path)
+        return f"{self.public_url_base}{storage_path.lstrip('/')}"
+
+    def invalidate_bucket(self):
+        """
+        À appeler quand une erreur storage indique que le bucket a disparu
+        """
+        logger.warning(f"Bucket {self.bucket_name} signalé absent, cache invalidé")
+        self.bucket_exists = False
+        self.refreshed_at = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "supabase_connected": self.supabase_connected,
+            "bucket_exists": self.bucket_exists,
+            "table_exists": self.table_exists,
+            "age_seconds": round(time.monotonic() - self.refreshed_at, 1) if self.refreshed_at else None
+        }
+
+    def start(self):
+        """
+        Préchauffe le cache et lance le rafraîchissement de fond (par processus)
+        """
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='storage-metadata', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.ttl)
+
+
+def is_missing_bucket_error(error: Exception) -> bool:
+    """
+    Reconnaît les erreurs storage « bucket introuvable »
+    """
+    message = str(error).lower()
+    return 'bucket not found' in message or 'bucket_not_found' in message
@@ -0,0 +1,126 @@
+"""
+Tests des appels LinkedIn (linkedin_auth.linkedin_request / request_token)
+contre un stub HTTP local : retries sur 5xx et 429 (Retry-After), pas de
+retry d'un POST token non idempotent après un timeout de lecture, 504 si
+LinkedIn est injoignable, budget LINKEDIN_CALL_DEADLINE respecté.
+"""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import linkedin_auth
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Rejoue les réponses de server.script dans l'ordre :
+    (statut, en-têtes, corps, délai avant réponse en secondes)
+    """
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.hits.append((self.command, self.path))
+        status, headers, body, delay = self.server.script.pop(0)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.script = []
+    server.hits = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_RETRY_BACKOFF', 0.01)
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_MAX_RETRIES', 2)
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_CONNECT_TIMEOUT', 1.0)
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_READ_TIMEOUT', 1.0)
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_CALL_DEADLINE', 5.0)
+    monkeypatch.setattr(linkedin_auth, '_http_client', None)
+
+
+def test_retries_503_then_succeeds(stub):
+    stub.script = [(503, {}, b'{}', 0), (200, {}, b'{"sub": "abc"}', 0)]
+
+    response = linkedin_auth.linkedin_request('GET', f'{stub.url}/v2/userinfo', 'userinfo')
+
+    assert response.status_code == 200
+    assert response.json() == {'sub': 'abc'}
+    assert len(stub.hits) == 2
+
+
+def test_429_waits_for_retry_after(stub):
+    stub.script = [(429, {'Retry-After': '1'}, b'{}', 0), (200, {}, b'{}', 0)]
+
+    started = time.monotonic()
+    response = linkedin_auth.linkedin_request('GET', f'{stub.url}/v2/userinfo', 'userinfo')
+
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 1.0
+    assert len(stub.hits) == 2
+
+
+def test_token_post_read_timeout_is_not_retried(stub, monkeypatch):
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_TOKEN_URL', f'{stub.url}/oauth/v2/accessToken')
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_READ_TIMEOUT', 0.2)
+    stub.script = [(200, {}, b'{"access_token": "late"}', 0.5), (200, {}, b'{"access_token": "t"}', 0)]
+
+    with pytest.raises(linkedin_auth.AuthError) as excinfo:
+        linkedin_auth.request_token({'grant_type': 'authorization_code', 'code': 'c'}, 'token exchange')
+
+    assert excinfo.value.status_code == 504
+    assert stub.hits == [('POST', '/oauth/v2/accessToken')]
+
+
+def test_connection_refused_returns_504(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_USERINFO_URL', f'http://127.0.0.1:{port}/v2/userinfo')
+
+    with pytest.raises(linkedin_auth.AuthError) as excinfo:
+        linkedin_auth.fetch_profile('token')
+
+    assert excinfo.value.status_code == 504
+
+
+def test_attempt_timeout_is_bounded_by_call_deadline(stub, monkeypatch):
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_READ_TIMEOUT', 5.0)
+    monkeypatch.setattr(linkedin_auth, 'LINKEDIN_CALL_DEADLINE', 0.5)
+    stub.script = [(200, {}, b'{}', 2)]
+
+    started = time.monotonic()
+    with pytest.raises(linkedin_auth.UpstreamError):
+        linkedin_auth.linkedin_request('GET', f'{stub.url}/v2/userinfo', 'userinfo')
+
+    assert time.monotonic() - started < 1.5
+    assert len(stub.hits) == 1
@@ -0,0 +1,155 @@
+"""
+Contrôles d'admission des uploads pour AE2I
+Rejet précoce, avant que le corps ne soit reçu ou spoulé :
+- plafond sur Content-Length et sur les octets effectivement lus
+- reconnaissance du type réel par signature (magic bytes)
+"""
+
+import os
+from typing import Optional, Tuple
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Octets nécessaires pour reconnaître toutes les signatures ci-dessous
+SNIFF_SIZE = 16
+
+# Type réel -> types MIME acceptés (le premier est le type canonique)
+KIND_MIME_TYPES = {
+    'jpeg': ('image/jpeg', 'image/jpg'),
+    'png': ('image/png',),
+    'gif': ('image/gif',),
+    'webp': ('image/webp',),
+    'mp4': ('video/mp4', 'video/quicktime'),
+    'avi': ('video/x-msvideo',),
+    'mkv': ('video/x-matroska',),
+    'pdf': ('application/pdf',),
+    'rar': ('application/x-rar-compressed', 'application/vnd.rar'),
+}
+
+# Conteneurs zip : le type MIME dépend de l'extension (le premier est le type canonique)
+ZIP_EXTENSION_MIME_TYPES = {
+    '.docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document',),
+    '.xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',),
+    '.pptx': ('application/vnd.openxmlformats-officedocument.presentationml.presentation',),
+    '.zip': ('application/zip', 'application/x-zip-compressed'),
+}
+
+# Extension autorisée -> types réels acceptés (docx/xlsx/pptx sont des archives zip)
+EXTENSION_KINDS = {
+    '.jpg': {'jpeg'},
+    '.jpeg': {'jpeg'},
+    '.png': {'png'},
+    '.gif': {'gif'},
+    '.webp': {'webp'},
+    '.mp4': {'mp4'},
+    '.mov': {'mp4'},
+    '.avi': {'avi'},
+    '.mkv': {'mkv'},
+    '.pdf': {'pdf'},
+    '.docx': {'zip'},
+    '.xlsx': {'zip'},
+    '.pptx': {'zip'},
+    '.zip': {'zip'},
+    '.rar': {'rar'},
+}
+
+# Atomes QuickTime/ISO BMFF rencontrés en tête de fichier (.mp4, .mov)
+ISO_BMFF_BOXES = {b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip'}
+
+
+def sniff_kind(head: bytes) -> Optional[str]:
+    """
+    Type réel d'un contenu d'après ses premiers octets
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    if head[4:8] in ISO_BMFF_BOXES:
+        return 'mp4'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'mkv'
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head[:4] in (b'PK\x03\x04', b'PK\x05\x06'):
+        return 'zip'
+    if head.startswith(b'Rar!\x1a\x07'):
+        return 'rar'
+    return None
+
+
+def check_signature(filename: str, mime_type: str, head: bytes) -> Tuple[bool, str, str]:
+    """
+    Vérifie que le contenu correspond à l'extension.
+    Un type MIME déclaré qui contredit le contenu est remplacé par le type
+    réel (le storage sert le fichier avec ce Content-Type).
+    Returns: (is_valid, error_message, mime_type)
+    """
+    file_ext = os.path.splitext(filename)[1].lower()
+    kind = sniff_kind(head)
+    expected = EXTENSION_KINDS.get(file_ext)
+
+    if expected is None:
+        return False, f"Extension non autorisée: {file_ext}", mime_type
+    if kind not in expected:
+        return False, f"Le contenu ne correspond pas à l'extension {file_ext}", mime_type
+
+    # Les conteneurs zip (docx, xlsx...) sont typés d'après leur extension
+    accepted = ZIP_EXTENSION_MIME_TYPES[file_ext] if kind == 'zip' else KIND_MIME_TYPES.get(kind)
+    if accepted and mime_type not in accepted:
+        mime_type = accepted[0]
+    return True, "", mime_type
+
+
+def sniff_stream(stream) -> bytes:
+    """
+    Premiers octets d'un flux rembobinable (position restaurée)
+    """
+    position = stream.tell()
+    head = stream.read(SNIFF_SIZE)
+    stream.seek(position)
+    return head
+
+
+class CappedStream:
+    """
+    Flux d'entrée WSGI qui interrompt la lecture au-delà de `limit` octets
+    (corps en chunked transfer ou Content-Length mensonger)
+    """
+
+    def __init__(self, stream, limit: int):
+        self._stream = stream
+        self._remaining = limit
+
+    def _account(self, data: bytes) -> bytes:
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise RequestEntityTooLarge()
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._remaining + 1
+        return self._account(self._stream.read(min(size, self._remaining + 1)))
+
+    def readline(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._remaining + 1
+        return self._account(self._stream.readline(min(size, self._remaining + 1)))
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        close = getattr(self._stream, 'close', None)
+        if close:
+            close()